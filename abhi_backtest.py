@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ABHI X2 — backtester for the trading_suggestion rule (NumPy, optional dependency)
+
+Rule being measured (same as trading_suggestion in abhi_x2_final.py):
+- long entry at the close of a decision bar
+- stop‑loss sl_up below entry if the 24h change is positive, else sl_down
+- take‑profit tp above entry; if neither is touched within the holding
+  horizon the trade exits at the close
+
+Every decision bar is scored independently (each one is "a suggestion").
+First‑touch times come from running max/min of the bar highs/lows after
+entry, searched for all thresholds at once — no per‑bar Python loops.
+Up‑trend and down‑trend trades are separable, so a full
+tp × sl_up × sl_down grid costs O(tp × sl) work per trade, not O(tp × sl²).
+Ties (stop and target inside the same bar) count as a stop.
+
+Data: CSV or Parquet with timestamp, open, high, low, close[, volume]
+(timestamps in s or ms). It is converted once to a ``.ohlcv.npy`` cache
+next to the source and memory‑mapped from then on; worker processes
+map the same file.
+
+    python abhi_backtest.py btc_1m.csv                     # score the current rule
+    python abhi_backtest.py btc_1m.parquet --grid --save   # sweep, write best params for the assistant
+    python abhi_backtest.py --synthetic 3000000 --grid     # timing run on a random walk
+"""
+
+import os, json, time, argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+TS, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+DEFAULT_PARAMS = {"sl_up": 0.01, "sl_down": 0.02, "tp": 0.03}
+DEFAULT_SL_GRID = [round(x, 4) for x in np.arange(0.005, 0.0501, 0.0025)]   # 19 values
+DEFAULT_TP_GRID = [round(x, 4) for x in np.arange(0.01, 0.1001, 0.005)]     # 19 values
+CHUNK_CELLS = 4_000_000   # entries × horizon cells per work unit (≈32 MB float64)
+
+# ───────────────────────── Data loading ─────────────────────────
+def _cache_path(path):
+    return path + ".ohlcv.npy"
+
+def _read_source(path):
+    if path.endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, memory_map=True)
+        names = [n.lower() for n in table.column_names]
+        cols = [table.column(names.index(c)).to_numpy() if c in names else None for c in COLUMNS]
+    else:
+        try:
+            import pandas as pd
+            df = pd.read_csv(path)
+            df.columns = [c.lower() for c in df.columns]
+            cols = [df[c].to_numpy() if c in df.columns else None for c in COLUMNS]
+        except ImportError:
+            with open(path, "r", encoding="utf-8") as f:
+                header = [c.strip().lower() for c in f.readline().split(",")]
+            raw = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+            cols = [raw[:, header.index(c)] if c in header else None for c in COLUMNS]
+    if cols[TS] is not None and np.issubdtype(np.asarray(cols[TS]).dtype, np.datetime64):
+        cols[TS] = np.asarray(cols[TS]).astype("datetime64[s]").astype(np.float64)
+    n = len(cols[CLOSE])
+    out = np.empty((n, len(COLUMNS)), dtype=np.float64)
+    for i, c in enumerate(cols):
+        out[:, i] = np.nan if c is None else np.asarray(c, dtype=np.float64)
+    if out[0, TS] > 1e11:
+        out[:, TS] /= 1000.0   # ms → s
+    return out
+
+def load_ohlcv(path):
+    """(n, 6) float64 array, memory‑mapped from the .npy cache (built on first use)."""
+    cache = _cache_path(path)
+    if not os.path.exists(cache) or os.path.getmtime(cache) < os.path.getmtime(path):
+        np.save(cache, _read_source(path))
+    return np.load(cache, mmap_mode="r")
+
+def synthetic_ohlcv(n, path, seed=7):
+    """Random‑walk minute bars for timing runs; written as an .npy cache."""
+    rng = np.random.default_rng(seed)
+    close = 30000.0 * np.exp(np.cumsum(rng.normal(0, 0.0008, n)))
+    spread = np.abs(rng.normal(0, 0.0006, n)) * close
+    out = np.empty((n, len(COLUMNS)))
+    out[:, TS] = 1.6e9 + 60.0 * np.arange(n)
+    out[:, OPEN] = np.concatenate(([close[0]], close[:-1]))
+    out[:, HIGH] = np.maximum(out[:, OPEN], close) + spread
+    out[:, LOW] = np.minimum(out[:, OPEN], close) - spread
+    out[:, CLOSE] = close
+    out[:, VOLUME] = rng.random(n)
+    np.save(_cache_path(path), out)
+    return _cache_path(path)
+
+def bars_per(seconds, data):
+    step = float(np.median(np.diff(np.asarray(data[:min(len(data), 10_000), TS]))))
+    return max(1, int(round(seconds / step)))
+
+# ───────────────────────── Core (vectorized) ─────────────────────────
+def _first_cross(mono, thresholds):
+    """mono: (m, H) rows non‑decreasing. For each threshold, index of the first
+    element >= threshold per row (H = never). One searchsorted for the lot:
+    rows are shifted apart so the flattened array is globally sorted."""
+    m, H = mono.shape
+    lo = float(mono.min())
+    span = float(mono.max()) - lo + 1.0
+    base = np.arange(m, dtype=np.float64) * span
+    flat = (mono - lo + base[:, None]).ravel()
+    q = np.asarray(thresholds, dtype=np.float64)[:, None] - lo + base[None, :]
+    idx = np.searchsorted(flat, q.ravel(), side="left").reshape(len(thresholds), m)
+    return np.minimum(idx - (np.arange(m) * H)[None, :], H).astype(np.int32)
+
+def _chunk_hits(job):
+    """Worker: first tp/sl touch times for a slice of entry bars."""
+    path, entries, horizon, lookback, tp_grid, sl_grid = job
+    data = np.load(path, mmap_mode="r")
+    close = data[:, CLOSE]
+    entry = np.asarray(close[entries])
+    # bars e+1 … e+horizon after each entry
+    hi = sliding_window_view(data[:, HIGH], horizon)[entries + 1] / entry[:, None] - 1.0
+    lo = sliding_window_view(data[:, LOW], horizon)[entries + 1] / entry[:, None] - 1.0
+    np.maximum.accumulate(hi, axis=1, out=hi)
+    np.minimum.accumulate(lo, axis=1, out=lo)
+    t_tp = _first_cross(hi, tp_grid)
+    t_sl = _first_cross(-lo, sl_grid)
+    ret_end = np.asarray(close[entries + horizon]) / entry - 1.0
+    up = entry > np.asarray(close[entries - lookback])
+    return t_tp, t_sl, ret_end, up
+
+def _trade_returns(t_tp, t_sl, ret_end, tp, sl, horizon, fee):
+    """Per‑trade return for broadcastable (tp, sl) choices."""
+    stop = (t_sl <= t_tp) & (t_sl < horizon)
+    target = ~stop & (t_tp < horizon)
+    return np.where(stop, -sl, np.where(target, tp, ret_end)) - fee, stop, target
+
+class Backtest:
+    """Precomputes first‑touch times once; scoring any grid point is then cheap."""
+
+    def __init__(self, path, every_hours=1.0, hold_hours=24.0, fee=0.001,
+                 tp_grid=None, sl_grid=None, workers=None):
+        self.path = path if path.endswith(".npy") else _cache_path(path)
+        data = np.load(self.path, mmap_mode="r") if path.endswith(".npy") else load_ohlcv(path)
+        self.n = len(data)
+        self.lookback = bars_per(24 * 3600, data)
+        self.horizon = bars_per(hold_hours * 3600, data)
+        self.fee = fee
+        self.tp_grid = np.asarray(sorted(set(tp_grid or DEFAULT_TP_GRID) | {DEFAULT_PARAMS["tp"]}))
+        self.sl_grid = np.asarray(sorted(set(sl_grid or DEFAULT_SL_GRID)
+                                         | {DEFAULT_PARAMS["sl_up"], DEFAULT_PARAMS["sl_down"]}))
+        step = bars_per(every_hours * 3600, data)
+        self.entries = np.arange(self.lookback, self.n - self.horizon - 1, step)
+        if not len(self.entries):
+            raise ValueError("not enough bars for the 24h lookback + holding horizon")
+        self.timestamps = np.asarray(data[self.entries, TS])
+        per = max(1, CHUNK_CELLS // self.horizon)
+        jobs = [(self.path, self.entries[i:i + per], self.horizon, self.lookback,
+                 self.tp_grid, self.sl_grid) for i in range(0, len(self.entries), per)]
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(workers) as ex:
+                parts = list(ex.map(_chunk_hits, jobs))
+        else:
+            parts = [_chunk_hits(j) for j in jobs]
+        self.t_tp = np.concatenate([p[0] for p in parts], axis=1)   # (T, m)
+        self.t_sl = np.concatenate([p[1] for p in parts], axis=1)   # (S, m)
+        self.ret_end = np.concatenate([p[2] for p in parts])
+        self.up = np.concatenate([p[3] for p in parts])
+
+    def _idx(self, grid, value):
+        i = int(np.argmin(np.abs(grid - value)))
+        if abs(grid[i] - value) > 1e-9:
+            raise ValueError(f"{value} not in grid")
+        return i
+
+    def returns(self, sl_up, sl_down, tp):
+        """Per‑trade returns (time order) plus stop/target masks for one parameter set."""
+        i = self._idx(self.tp_grid, tp)
+        ju, jd = self._idx(self.sl_grid, sl_up), self._idx(self.sl_grid, sl_down)
+        t_sl = np.where(self.up, self.t_sl[ju], self.t_sl[jd])
+        sl = np.where(self.up, sl_up, sl_down)
+        return _trade_returns(self.t_tp[i], t_sl, self.ret_end, tp, sl, self.horizon, self.fee)
+
+    def report(self, sl_up, sl_down, tp):
+        r, stop, target = self.returns(sl_up, sl_down, tp)
+        equity = np.cumsum(r)   # one unit staked per suggestion
+        dd = float(np.max(np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:] - equity)) if len(r) else 0.0
+        return {
+            "params": {"sl_up": float(sl_up), "sl_down": float(sl_down), "tp": float(tp)},
+            "trades": int(len(r)),
+            "pnl_pct": round(float(r.sum()) * 100, 3),
+            "avg_trade_pct": round(float(r.mean()) * 100, 4) if len(r) else 0.0,
+            "hit_rate": round(float(target.mean()), 4) if len(r) else 0.0,
+            "stop_rate": round(float(stop.mean()), 4) if len(r) else 0.0,
+            "max_drawdown_pct": round(dd * 100, 3),
+        }
+
+    def sweep(self, top=5):
+        """Score every (tp, sl_up, sl_down) combination; best `top` reports by PnL."""
+        tp = self.tp_grid[:, None, None]
+        sl = self.sl_grid[None, :, None]
+        totals = {}
+        for name, mask in (("up", self.up), ("down", ~self.up)):
+            r, _, _ = _trade_returns(self.t_tp[:, None, mask], self.t_sl[None, :, mask],
+                                     self.ret_end[mask], tp, sl, self.horizon, self.fee)
+            totals[name] = r.sum(axis=2)                                  # (T, S)
+        pnl = totals["up"][:, :, None] + totals["down"][:, None, :]       # (T, S_up, S_down)
+        order = np.argsort(pnl, axis=None)[::-1][:top]
+        best = [np.unravel_index(k, pnl.shape) for k in order]
+        return pnl.size, [self.report(self.sl_grid[j], self.sl_grid[k], self.tp_grid[i]) for i, j, k in best]
+
+# ───────────────────────── CLI ─────────────────────────
+def default_params_file():
+    # same location the assistant reads (LOG_DIR/trade_params.json)
+    if "com.termux" in os.environ.get("PREFIX", "") or os.path.exists("/data/data/com.termux/files/usr"):
+        return "/sdcard/vega_logs/trade_params.json"
+    return os.path.join(os.path.expanduser("~"), ".abhi_logs", "trade_params.json")
+
+def main():
+    ap = argparse.ArgumentParser(description="Backtest the ABHI trading_suggestion rule")
+    ap.add_argument("data", nargs="?", help="OHLCV .csv / .parquet (or an .ohlcv.npy cache)")
+    ap.add_argument("--synthetic", type=int, metavar="BARS", help="generate a random‑walk minute series instead")
+    ap.add_argument("--every-hours", type=float, default=1.0, help="hours between decision bars")
+    ap.add_argument("--hold-hours", type=float, default=24.0, help="max holding time before exiting at close")
+    ap.add_argument("--fee", type=float, default=0.001, help="round‑trip fee as a fraction")
+    ap.add_argument("--grid", action="store_true", help="sweep tp × sl_up × sl_down")
+    ap.add_argument("--top", type=int, default=5)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--save", nargs="?", const=default_params_file(), metavar="PATH",
+                    help="write the best parameter set for the assistant (default: LOG_DIR/trade_params.json)")
+    args = ap.parse_args()
+
+    if args.synthetic:
+        path = synthetic_ohlcv(args.synthetic, os.path.join(os.getcwd(), f"synthetic_{args.synthetic}"))
+    elif args.data:
+        path = args.data
+    else:
+        ap.error("give a data file or --synthetic BARS")
+
+    t0 = time.perf_counter()
+    bt = Backtest(path, every_hours=args.every_hours, hold_hours=args.hold_hours,
+                  fee=args.fee, workers=args.workers)
+    t1 = time.perf_counter()
+    print(f"{bt.n} bars, {len(bt.entries)} decisions, horizon {bt.horizon} bars — "
+          f"touch times in {t1 - t0:.2f} s")
+    print("current rule:", json.dumps(bt.report(**DEFAULT_PARAMS)))
+    if not args.grid:
+        return
+    combos, best = bt.sweep(args.top)
+    print(f"swept {combos} combinations in {time.perf_counter() - t1:.2f} s")
+    for rep in best:
+        print(json.dumps(rep))
+    if args.save:
+        rec = {**best[0]["params"], "source": os.path.basename(path), "time": time.time(),
+               "pnl_pct": best[0]["pnl_pct"], "hit_rate": best[0]["hit_rate"],
+               "max_drawdown_pct": best[0]["max_drawdown_pct"]}
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(rec, f, indent=2)
+        print("saved →", args.save)
+
+if __name__ == "__main__":
+    main()
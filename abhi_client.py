@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ABHI X2 — thin client for the daemon (python abhi_x2_final.py --daemon)
+
+Stdlib only and does not import the assistant, so a bridge pays for one
+socket round trip instead of a full cold start.
+
+    python abhi_client.py "time batao"            # print replies
+    python abhi_client.py --json "screenshot lo"  # raw JSON result
+    echo -e "time\\nbattery" | python abhi_client.py --json   # one request per stdin line
+"""
+
+import os, sys, json, stat, socket, argparse
+
+# same place as abhi_x2_final.DAEMON_SOCKET: a 0700 per‑user directory
+DEFAULT_SOCKET = os.path.join(os.path.join(os.environ["XDG_RUNTIME_DIR"], "abhi") if os.environ.get("XDG_RUNTIME_DIR")
+                              else os.path.join(os.path.expanduser("~"), ".abhi_run"), "daemon.sock")
+
+def check_socket(path):
+    """Refuse a socket another user could have planted (ours, in a dir only we can use)."""
+    d, st = os.lstat(os.path.dirname(path) or "."), os.lstat(path)
+    uid = os.getuid()
+    if not (stat.S_ISDIR(d.st_mode) and d.st_uid == uid and not d.st_mode & 0o077):
+        raise PermissionError(f"{os.path.dirname(path)} is not a private directory owned by you")
+    if not (stat.S_ISSOCK(st.st_mode) and st.st_uid == uid):
+        raise PermissionError(f"{path} is not a socket owned by you")
+
+def request_many(payloads, path=DEFAULT_SOCKET, timeout=180):
+    """Pipeline payloads over one connection; results come back in request order."""
+    check_socket(path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as c:
+        c.settimeout(timeout)
+        c.connect(path)
+        for i, p in enumerate(payloads):
+            c.sendall((json.dumps({"id": i, **p}, ensure_ascii=False) + "\n").encode("utf-8"))
+        c.shutdown(socket.SHUT_WR)
+        buf = b""
+        while True:
+            chunk = c.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+    results = [json.loads(line) for line in buf.splitlines() if line.strip()]
+    return sorted(results, key=lambda r: r.get("id", 0))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("command", nargs="?", help="utterance to run (default: read lines from stdin)")
+    ap.add_argument("--json", action="store_true", help="print raw JSON results")
+    ap.add_argument("--quiet", action="store_true", help="don't print/speak on the device")
+    ap.add_argument("--socket", default=DEFAULT_SOCKET)
+    args = ap.parse_args()
+
+    texts = [args.command] if args.command else [ln.strip() for ln in sys.stdin if ln.strip()]
+    try:
+        results = request_many([{"command": t, "quiet": args.quiet} for t in texts], path=args.socket)
+    except OSError as e:
+        print(f"daemon not reachable on {args.socket}: {e}", file=sys.stderr)
+        return 2
+    ok = True
+    for r in results:
+        ok = ok and r.get("ok", False)
+        if args.json:
+            print(json.dumps(r, ensure_ascii=False))
+        else:
+            for line in r.get("replies", []):
+                print(line)
+            if not r.get("ok"):
+                print("error:", r.get("error"), file=sys.stderr)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,308 +1,2908 @@
 #!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ABHI X2 — Final merged build (auto‑mic detect + Ubuntu→Termux auto‑switch + text fallback)
+
+- Voice assistant (hi/en) with safe fallbacks
+- Termux device controls (screenshot, camera, volume, lock/unlock, notifications)
+- Friendly small‑talk + simple intent normalizer
+- Optional Hugging Face reply fallback (set HF_API_KEY)
+- Ethical pentest flow: whitelist + invite token + typed confirmation + approved command list
+- Logs, audit, memory, suggested fixes
+- Self‑update daemon from GitHub raw URL (optional)
+
+Owner: ARVIND
+"""
+
+import os, sys, time, json, re, math, subprocess, threading, platform, argparse, atexit, contextvars, difflib, heapq, importlib, importlib.util, itertools, queue, socket, stat, unicodedata
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+
+class LazyModule:
+    """Module proxy: imports on first attribute access, falsy if not installed.
+    Keeps heavy deps (requests, speech_recognition, asyncio) off the startup path."""
+
+    def __init__(self, name):
+        self._name = name
+        self._mod = None
+        self._failed = False
+
+    def _load(self):
+        if self._mod is None and not self._failed:
+            try:
+                self._mod = importlib.import_module(self._name)
+            except Exception:
+                self._failed = True
+        return self._mod
+
+    def __bool__(self):
+        return self._load() is not None
+
+    def __getattr__(self, attr):
+        mod = self._load()
+        if mod is None:
+            raise ImportError(f"{self._name} is not installed")
+        return getattr(mod, attr)
+
+requests = LazyModule("requests")
+asyncio  = LazyModule("asyncio")
+sr       = LazyModule("speech_recognition")
+
+# ───────────────────────── Config / Paths ─────────────────────────
+ASSISTANT_NAME = "ABHI"
+OPERATOR_NAME  = "ARVIND"
+
+# Optional: HuggingFace text fallback
+HF_API_KEY  = ""  # e.g. "hf_xxx" (leave blank to disable)
+HF_MODEL    = "gpt2"
+HF_API_URL  = f"https://api-inference.huggingface.co/models/{HF_MODEL}"
+
+# Optional: self‑update from your repo raw URL (leave blank to disable)
+UPDATE_URL  = ""  # e.g. "https://raw.githubusercontent.com/<you>/<repo>/main/abhi_x2_final.py"
+UPDATE_INTERVAL = 3600  # seconds
+
+# Where to store logs/files
+IS_TERMUX   = "com.termux" in os.environ.get("PREFIX", "") or \
+              "/data/data/com.termux/files/usr" in os.environ.get("PREFIX", "") or \
+              os.path.exists("/data/data/com.termux/files/usr")
+ANDROID_ROOT = os.environ.get("ANDROID_ROOT") or (os.path.exists("/system/bin") and "android")
+HOME = os.path.expanduser("~")
+
+if IS_TERMUX:
+    LOG_DIR = "/sdcard/vega_logs"
+    SCREENSHOT_DIR = "/sdcard/vega_screenshots"
+else:
+    LOG_DIR = os.path.join(HOME, ".abhi_logs")
+    SCREENSHOT_DIR = os.path.join(LOG_DIR, "screenshots")
+
+# LOG_DIR / SCREENSHOT_DIR are created on first write, not at import
+SELF_FILE = os.path.abspath(sys.argv[0])
+
+# Files
+FEEDBACK_FILE       = os.path.join(LOG_DIR, "feedback.json")
+USAGE_FILE          = os.path.join(LOG_DIR, "usage.json")
+SUGGESTED_FIXES     = os.path.join(LOG_DIR, "suggested_fixes.json")
+APP_MAP_FILE        = os.path.join(LOG_DIR, "app_mapping.json")
+MEMORY_FILE         = os.path.join(LOG_DIR, "memory.json")
+AUDIT_LOG           = os.path.join(LOG_DIR, "audit.log")
+APPROVED_CMDS_FILE  = os.path.join(LOG_DIR, "approved_commands.json")
+WHITELIST_FILE      = os.path.join(LOG_DIR, "whitelist.json")
+TRADE_PARAMS_FILE   = os.path.join(LOG_DIR, "trade_params.json")  # written by abhi_backtest.py --save
+
+# Defaults
+DEFAULT_APP_MAP = {
+    "whatsapp": "com.whatsapp",
+    "youtube": "com.google.android.youtube",
+    "camera":  "com.android.camera"
+}
+
+DEFAULT_APPROVED = {
+    "ping":      ["ping","-c","4","{target}"],
+    "http_head": ["curl","-I","{target}"],
+    "port_scan": ["nmap","-sT","-p","1-1024","{target}"]
+}
+
+DEFAULT_WHITELIST = {
+    "198.51.100.23": {
+        "owner": "security@acme.example",
+        "token": "invite-ACME-2025-08",
+        "notes": "ACME invite scope: single host"
+    },
+    "lab.local": {"owner": "me", "token": "local-lab", "notes": "local test only"}
+}
+
+# ───────────────────────── Small Utils ─────────────────────────
+def load_json(path, default):
+    try:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    except Exception:
+        pass
+    return default
+
+def save_json(path, data):
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    except Exception:
+        pass
+
+def save_json_atomic(path, data, indent=2):
+    # temp file + rename: readers never see a half-written file
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except Exception:
+            pass
+
+# ───────────────────────── Latency spans / histograms ─────────────────────────
+# A turn is one utterance end to end (STT → intent → handle_intent → replies);
+# in voice mode it starts when speech is detected, and the idle wait before
+# that is recorded as "stt_wait" outside any turn.
+# span("stage") times a stage inside the current turn; when the turn ends
+# every stage is recorded under the turn's intent. Stage times are inclusive
+# (e.g. "hf" contains its "http"). Spans outside a turn are recorded under "-".
+LAT_ENABLED         = True
+LAT_BUCKETS_PER_OCT = 8          # histogram resolution: ~9% wide buckets (±4.5% error)
+LAT_EXPORT_FILE     = os.path.join(LOG_DIR, "latency.jsonl")
+LAT_SAMPLE_INTERVAL = 0.005      # seconds between stack samples (PROFILE sample)
+LAT_PROFILE_TOP     = 20         # rows printed when a profile stops
+
+_TURN = contextvars.ContextVar("turn", default=None)
+
+class LatencyHistogram:
+    """Log‑bucketed latency histogram: O(1) record, mergeable, ~4.5% error."""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = {}    # bucket → count; bucket i covers 2**(i/B) .. 2**((i+1)/B) µs
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, secs):
+        us = secs * 1e6
+        i = int(math.log2(us) * LAT_BUCKETS_PER_OCT) if us > 1 else 0
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+        self.count += 1
+        self.total += secs
+        if secs > self.max:
+            self.max = secs
+
+    def merge(self, other):
+        for i, n in other.buckets.items():
+            self.buckets[i] = self.buckets.get(i, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, q):
+        """Seconds below which q% of the samples fall (bucket midpoint)."""
+        if not self.count:
+            return 0.0
+        rank, seen = max(1, math.ceil(q / 100 * self.count)), 0
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if seen >= rank:
+                return min(2 ** ((i + 0.5) / LAT_BUCKETS_PER_OCT) / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        ms = lambda secs: round(secs * 1e3, 3)
+        return {"count": self.count, "mean_ms": ms(self.total / self.count) if self.count else 0.0,
+                "p50_ms": ms(self.percentile(50)), "p95_ms": ms(self.percentile(95)),
+                "p99_ms": ms(self.percentile(99)), "max_ms": ms(self.max)}
+
+class Turn:
+    """Context manager for one utterance; collects stage spans, records on exit."""
+
+    __slots__ = ("intent", "stages", "t0", "_token", "_prof")
+
+    def __init__(self, intent=None, start=None):
+        self.intent = intent
+        self.stages = []
+        self.t0 = start  # perf_counter() the turn began, if before __enter__
+
+    def add(self, stage, secs):
+        self.stages.append((stage, secs))
+
+    def __enter__(self):
+        prof = TELEMETRY._profiler
+        self._prof = prof if prof and prof.enter() else None
+        self._token = _TURN.set(self)
+        if self.t0 is None:
+            self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        _TURN.reset(self._token)
+        if self._prof:
+            self._prof.exit()
+        if self.intent:  # nothing was heard/handled: not a turn
+            TELEMETRY.record_turn(self, dt)
+
+class _Span:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        turn = _TURN.get()
+        if turn is not None:
+            turn.stages.append((self.stage, dt))
+        else:
+            TELEMETRY.record(None, self.stage, dt)
+
+def span(stage):
+    """with span("hf"): ... — time a pipeline stage (see Latency spans above)."""
+    return _Span(stage)
+
+class _TurnProfiler:
+    """cProfile enabled around turns (one at a time), accumulated across turns."""
+
+    mode = "cprofile"
+
+    def __init__(self):
+        import cProfile
+        self.prof = cProfile.Profile()
+        self._busy = threading.Lock()
+
+    def enter(self):
+        if not self._busy.acquire(blocking=False):
+            return False  # concurrent daemon turn: only one is profiled at a time
+        try:
+            self.prof.enable()
+            return True
+        except ValueError:  # another profiler already active
+            self._busy.release()
+            return False
+
+    def exit(self):
+        self.prof.disable()
+        self._busy.release()
+
+    def stop(self, base):
+        import io, pstats
+        path = base + ".prof"
+        self.prof.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(self.prof, stream=out).sort_stats("cumulative").print_stats(LAT_PROFILE_TOP)
+        return path, [ln for ln in out.getvalue().splitlines() if ln.strip()]
+
+class _Sampler:
+    """Samples the stacks of threads that are inside a turn every
+    LAT_SAMPLE_INTERVAL; writes folded stacks (flamegraph.pl / speedscope)."""
+
+    mode = "sample"
+
+    def __init__(self, interval=LAT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._threads = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+
+    def enter(self):
+        self._threads.add(threading.get_ident())
+        return True
+
+    def exit(self):
+        self._threads.discard(threading.get_ident())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for tid in list(self._threads):
+                frame, stack = frames.get(tid), []
+                while frame is not None:
+                    stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self, base):
+        self._stop.set()
+        self._thread.join()
+        path = base + ".folded"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in self.stacks.items():
+                f.write(f"{stack} {n}\n")
+        total = sum(self.stacks.values()) or 1
+        leaves = Counter()
+        for stack, n in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += n
+        return path, ([f"{n:6d} {n / total:6.1%}  {leaf}" for leaf, n in leaves.most_common(LAT_PROFILE_TOP)]
+                      or ["(no samples — every turn finished between samples)"])
+
+class Telemetry:
+    """Per‑(intent, stage) latency histograms, JSONL export and the profiler toggle."""
+
+    PROFILERS = {"cprofile": _TurnProfiler, "sample": _Sampler}
+
+    def __init__(self, enabled=LAT_ENABLED):
+        self.enabled = enabled
+        self.since = time.time()
+        self._lock = threading.Lock()
+        self._hists = {}         # (intent, stage) → LatencyHistogram
+        self._profiler = None
+
+    def turn(self, intent=None, start=None):
+        return Turn(intent, start)
+
+    def _record(self, intent, stage, secs):
+        key = (intent or "-", stage)
+        h = self._hists.get(key)
+        if h is None:
+            h = self._hists[key] = LatencyHistogram()
+        h.record(secs)
+
+    def record(self, intent, stage, secs):
+        if self.enabled:
+            with self._lock:
+                self._record(intent, stage, secs)
+
+    def record_turn(self, turn, secs):
+        if self.enabled:
+            with self._lock:
+                for stage, dt in turn.stages:
+                    self._record(turn.intent, stage, dt)
+                self._record(turn.intent, "turn", secs)
+
+    def reset(self):
+        with self._lock:
+            self._hists.clear()
+            self.since = time.time()
+
+    def snapshot(self, by=None):
+        """{key: summary}; by="intent" → whole turns per intent, by="stage" →
+        each stage merged over intents, default → every (intent, stage)."""
+        with self._lock:
+            items = [(k, LatencyHistogram().merge(h)) for k, h in self._hists.items()]
+        if by is None:
+            return {k: h.summary() for k, h in sorted(items)}
+        merged = {}
+        for (intent, stage), h in items:
+            if by == "intent" and stage == "turn":
+                merged[intent] = h
+            elif by == "stage" and stage != "turn":
+                merged[stage] = merged[stage].merge(h) if stage in merged else h
+        return {k: h.summary() for k, h in sorted(merged.items())}
+
+    def report(self, intent=None):
+        """Human‑readable STATS table (one intent's stages if intent is given)."""
+        row = lambda name, m: (f"  {name:16s} n={m['count']:<6d} p50 {m['p50_ms']:9.2f}  p95 {m['p95_ms']:9.2f}  "
+                               f"p99 {m['p99_ms']:9.2f}  max {m['max_ms']:9.2f}")
+        lines = [f"Latency (ms) since {time.strftime('%H:%M:%S', time.localtime(self.since))}"]
+        if intent:
+            lines.append(f"{intent}:")
+            lines += [row(st, m) for (i, st), m in self.snapshot().items() if i == intent]
+            return lines
+        for by in ("intent", "stage"):
+            lines.append(f"by {by}:")
+            lines += [row(k, m) for k, m in self.snapshot(by).items()] or ["  (no samples yet)"]
+        return lines
+
+    def export(self, path=LAT_EXPORT_FILE, **extra):
+        """Append one JSON line per (intent, stage) histogram; returns line count."""
+        now = time.time()
+        rows = [{"ts": now, "since": self.since, "intent": i, "stage": st, **extra, **m}
+                for (i, st), m in self.snapshot().items()]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        return len(rows)
+
+    def start_profile(self, mode="sample"):
+        if self._profiler is not None or mode not in self.PROFILERS:
+            return False
+        self._profiler = self.PROFILERS[mode]()
+        return True
+
+    def stop_profile(self):
+        """Stop the running profiler → (output path, summary lines) or None."""
+        prof, self._profiler = self._profiler, None
+        if prof is None:
+            return None
+        os.makedirs(LOG_DIR, exist_ok=True)
+        return prof.stop(os.path.join(LOG_DIR, f"profile_{prof.mode}_{int(time.time())}"))
+
+TELEMETRY = Telemetry()
+
+# ───────────────────────── Config registry ─────────────────────────
+APP_FUZZY_CUTOFF = 0.8   # difflib ratio for "whatsap" → whatsapp style matches
+
+class ConfigFile:
+    """One JSON config parsed once into a typed view.
+
+    get() only stats the file; it is re‑parsed (and derived structures
+    rebuilt) when mtime/size change. A broken edit keeps the last good view.
+    update() writes file + view together via temp file + rename.
+    """
+
+    def __init__(self, path, default, build=None, create=True):
+        self.path = path
+        self.default = default
+        self.build = build or (lambda raw: raw)
+        self.create = create
+        self.raw = None
+        self._view = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def get(self):
+        stamp = self._stat()
+        if stamp is not None and stamp == self._stamp:
+            return self._view
+        with self._lock:
+            if stamp is None:
+                if self._view is None:
+                    raw = json.loads(json.dumps(self.default))
+                    if self.create:
+                        save_json_atomic(self.path, raw)
+                        stamp = self._stat()
+                    self._set(raw, stamp)
+                return self._view
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+                self._set(raw, stamp)
+            except Exception as e:
+                print(f"[config] {os.path.basename(self.path)}: {e} — keeping previous")
+                if self._view is None:
+                    self._set(json.loads(json.dumps(self.default)), None)
+                self._stamp = stamp
+            return self._view
+
+    def _set(self, raw, stamp):
+        self.raw, self._view, self._stamp = raw, self.build(raw), stamp
+
+    def update(self, fn):
+        """fn(raw_dict) mutates a copy; the result is persisted atomically."""
+        self.get()
+        with self._lock:
+            raw = json.loads(json.dumps(self.raw))
+            fn(raw)
+            save_json_atomic(self.path, raw)
+            self._set(raw, self._stat())
+        return self._view
+
+def normalize_app_name(name):
+    return re.sub(r"[\s._-]+", "", (name or "").strip().lower())
+
+class AppMap:
+    """app_mapping.json view with a normalized‑name index and fuzzy lookup."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.index = {normalize_app_name(k): v for k, v in raw.items()}
+
+    def lookup(self, name):
+        key = normalize_app_name(name)
+        if key in self.index:
+            return self.index[key]
+        close = difflib.get_close_matches(key, list(self.index), n=1, cutoff=APP_FUZZY_CUTOFF)
+        return self.index[close[0]] if close else None
+
+class ApprovedCommand:
+    """approved_commands.json entry with its {target} slots precomputed."""
+
+    def __init__(self, argv):
+        self.argv = [str(p) for p in argv]
+        self.slots = [i for i, p in enumerate(self.argv) if "{target}" in p]
+
+    def render(self, target):
+        parts = list(self.argv)
+        for i in self.slots:
+            parts[i] = parts[i].replace("{target}", target)
+        return parts
+
+APP_MAP      = ConfigFile(APP_MAP_FILE, DEFAULT_APP_MAP, AppMap)
+APPROVED     = ConfigFile(APPROVED_CMDS_FILE, DEFAULT_APPROVED,
+                          lambda raw: {k: ApprovedCommand(v) for k, v in raw.items()})
+WHITELIST    = ConfigFile(WHITELIST_FILE, DEFAULT_WHITELIST)
+TRADE_PARAMS = ConfigFile(TRADE_PARAMS_FILE, {}, lambda raw: {**DEFAULT_TRADE_PARAMS, **raw}, create=False)
+
+# ───────────────────────── Log store (append‑only JSONL) ─────────────────────────
+# Each stream is a directory of numbered JSONL segments; the highest number is
+# the active one. append() only buffers in memory — a single background writer
+# batches the write + fsync, so the voice/text loop never rewrites history.
+STREAMS_DIR        = os.path.join(LOG_DIR, "streams")
+LOG_FLUSH_INTERVAL = 0.5              # seconds between background flushes
+LOG_FLUSH_BATCH    = 64               # flush early once this many records are pending
+LOG_SEGMENT_BYTES  = 4 * 1024 * 1024  # rotate active segment after this size
+LOG_SEGMENT_AGE    = 24 * 3600        # ... or after this many seconds
+LOG_MAX_SEGMENTS   = 16               # rotated segments before compaction merges them
+MEMORY_KEEP_RECORDS = 20000           # conversations retained (and searchable via MEMORY_INDEX)
+
+def _count_lines(path):
+    n = 0
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                n += chunk.count(b"\n")
+    except Exception:
+        pass
+    return n
+
+def _truncate_torn_tail(path):
+    """Cut a partial last line (crash mid‑write) so the next append starts on a
+    fresh line instead of merging a good record into the torn one."""
+    try:
+        with open(path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                step = min(pos, 1 << 16)
+                f.seek(pos - step)
+                nl = f.read(step).rfind(b"\n")
+                if nl >= 0:
+                    pos = pos - step + nl + 1
+                    break
+                pos -= step
+            if pos < end:
+                f.truncate(pos)
+    except FileNotFoundError:
+        pass
+
+def _read_jsonl(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except Exception:
+                    continue  # torn/partial line
+    except FileNotFoundError:
+        return
 
--- coding: utf-8 --
-
-""" ABHI X2 — Final merged build (auto‑mic detect + Ubuntu→Termux auto‑switch + text fallback)
-
-Voice assistant (hi/en) with safe fallbacks
-
-Termux device controls (screenshot, camera, volume, lock/unlock, notifications)
-
-Friendly small‑talk + simple intent normalizer
-
-Optional Hugging Face reply fallback (set HF_API_KEY)
-
-Ethical pentest flow: whitelist + invite token + typed confirmation + approved command list
-
-Logs, audit, memory, suggested fixes
-
-Self‑update daemon from GitHub raw URL (optional)
-
-
-Owner: ARVIND """
-
-import os, sys, time, json, re, subprocess, threading, platform, argparse, requests from collections import Counter
-
-───────────────────────── Config / Paths ─────────────────────────
-
-ASSISTANT_NAME = "ABHI" OPERATOR_NAME  = "ARVIND"
-
-Optional: HuggingFace text fallback
-
-HF_API_KEY  = ""  # e.g. "hf_xxx" (leave blank to disable) HF_MODEL    = "gpt2" HF_API_URL  = f"https://api-inference.huggingface.co/models/{HF_MODEL}"
-
-Optional: self‑update from your repo raw URL (leave blank to disable)
-
-UPDATE_URL  = ""  # e.g. "https://raw.githubusercontent.com/<you>/<repo>/main/abhi_x2_final.py" UPDATE_INTERVAL = 3600  # seconds
-
-Where to store logs/files
-
-IS_TERMUX   = "com.termux" in os.environ.get("PREFIX", "") or 
-"/data/data/com.termux/files/usr" in os.environ.get("PREFIX", "") or 
-os.path.exists("/data/data/com.termux/files/usr") ANDROID_ROOT = os.environ.get("ANDROID_ROOT") or (os.path.exists("/system/bin") and "android") HOME = os.path.expanduser("~")
-
-if IS_TERMUX: LOG_DIR = "/sdcard/vega_logs" SCREENSHOT_DIR = "/sdcard/vega_screenshots" else: LOG_DIR = os.path.join(HOME, ".abhi_logs") SCREENSHOT_DIR = os.path.join(LOG_DIR, "screenshots")
-
-os.makedirs(LOG_DIR, exist_ok=True) os.makedirs(SCREENSHOT_DIR, exist_ok=True) SELF_FILE = os.path.abspath(sys.argv[0])
-
-Files
-
-FEEDBACK_FILE       = os.path.join(LOG_DIR, "feedback.json") USAGE_FILE          = os.path.join(LOG_DIR, "usage.json") SUGGESTED_FIXES     = os.path.join(LOG_DIR, "suggested_fixes.json") APP_MAP_FILE        = os.path.join(LOG_DIR, "app_mapping.json") MEMORY_FILE         = os.path.join(LOG_DIR, "memory.json") AUDIT_LOG           = os.path.join(LOG_DIR, "audit.log") APPROVED_CMDS_FILE  = os.path.join(LOG_DIR, "approved_commands.json") WHITELIST_FILE      = os.path.join(LOG_DIR, "whitelist.json")
-
-Defaults
-
-DEFAULT_APP_MAP = { "whatsapp": "com.whatsapp", "youtube": "com.google.android.youtube", "camera":  "com.android.camera" }
-
-DEFAULT_APPROVED = { "ping":      ["ping","-c","4","{target}"], "http_head": ["curl","-I","{target}"], "port_scan": ["nmap","-sT","-p","1-1024","{target}"] }
-
-───────────────────────── Small Utils ─────────────────────────
-
-def load_json(path, default): try: if os.path.exists(path): with open(path, "r", encoding="utf-8") as f: return json.load(f) except Exception: pass return default
-
-def save_json(path, data): try: with open(path, "w", encoding="utf-8") as f: json.dump(data, f, indent=2, ensure_ascii=False) except Exception: pass
-
-for p, d in [ (FEEDBACK_FILE, []), (USAGE_FILE, []), (SUGGESTED_FIXES, []), (APP_MAP_FILE, DEFAULT_APP_MAP.copy()), (MEMORY_FILE, {"conversations": []}), (APPROVED_CMDS_FILE, DEFAULT_APPROVED.copy()), (WHITELIST_FILE, { "198.51.100.23": { "owner": "security@acme.example", "token": "invite-ACME-2025-08", "notes": "ACME invite scope: single host" }, "lab.local": {"owner": "me", "token": "local-lab", "notes": "local test only"} }) ]: if not os.path.exists(p): save_json(p, d)
-
-───────────────────────── Speech / Mic detect ─────────────────────────
-
-def list_input_devices_sounddevice(): try: import sounddevice as sd devs = sd.query_devices() return [d for d in devs if d.get('max_input_channels', 0) > 0] except Exception: return []
-
-def any_microphone_available(): # Try sounddevice first if list_input_devices_sounddevice(): return True # Fallback: SpeechRecognition device list try: import speech_recognition as sr names = sr.Microphone.list_microphone_names() return bool(names) except Exception: return False
-
-def is_inside_proot_like_linux(): # Heuristic: Linux, AND /system/bin exists (Android root visible), but not Termux PREFIX if IS_TERMUX: return False if platform.system().lower() == "linux" and os.path.exists("/system/bin"): return True return False
-
-def termux_python_path(): # Common Termux python locations candidates = [ "/data/data/com.termux/files/usr/bin/python", "/data/data/com.termux/files/usr/bin/python3" ] for c in candidates: if os.path.exists(c): return c return None
-
-def try_relaunch_in_termux(script_path: str, extra_args=None): """Attempt to relaunch this script under Termux's Python if available. Works best when the script lives in /sdcard (shared storage). """ py = termux_python_path() if not py: return False, "termux python not found" if not os.path.exists(script_path): return False, "script not visible at given path" cmd = [py, script_path] if extra_args: cmd += extra_args try: subprocess.Popen(cmd) return True, "spawned" except Exception as e: return False, str(e)
-
-───────────────────────── TTS / Notify ─────────────────────────
-
-def speak(text: str): print(f"{ASSISTANT_NAME}: {text}") if IS_TERMUX: try: subprocess.run(["termux-tts-speak", "-l", "hi", text], check=False) except Exception: pass else: try: import pyttsx3 eng = pyttsx3.init() eng.say(text) eng.runAndWait() except Exception: pass
-
-def notify(text: str): if IS_TERMUX: try: subprocess.run(["termux-notification", "--title", ASSISTANT_NAME, "--content", text], check=False) except Exception: pass
-
-───────────────────────── Logging / Memory / Audit ─────────────────────────
-
-def audit_log(entry: dict): rec = {"ts": time.time(), "human_time": time.ctime(), **entry} try: with open(AUDIT_LOG, "a", encoding="utf-8") as f: f.write(json.dumps(rec, ensure_ascii=False) + "\n") except Exception: pass
-
-def log_feedback(cmd, status, details=""): arr = load_json(FEEDBACK_FILE, []) arr.append({"time": time.time(), "human_time": time.ctime(), "command": cmd, "status": status, "details": details}) save_json(FEEDBACK_FILE, arr)
-
-def log_usage(cmd): arr = load_json(USAGE_FILE, []) arr.append({"time": time.time(), "command": cmd}) save_json(USAGE_FILE, arr)
-
-def save_memory(user, assistant): mem = load_json(MEMORY_FILE, {"conversations": []}) mem["conversations"].append({"time": time.time(), "human_time": time.ctime(), "user": user, "assistant": assistant}) mem["conversations"] = mem["conversations"][-500:] save_json(MEMORY_FILE, mem)
-
-───────────────────────── Device actions (Termux) ─────────────────────────
-
-def termux_cmd(args, label, timeout=120): try: proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout, check=True) log_feedback(label, "success") return True, proc.stdout except subprocess.CalledProcessError as e: log_feedback(label, "fail", e.stderr or str(e)) return False, e.stderr or str(e) except Exception as e: log_feedback(label, "fail", str(e)) return False, str(e)
-
-def take_screenshot(): path = os.path.join(SCREENSHOT_DIR, f"screenshot_{int(time.time())}.png") if IS_TERMUX: ok, _ = termux_cmd(["termux-screenshot", path], "screenshot") speak("स्क्रीनशॉट ले लिया गया" if ok else "स्क्रीनशॉट लेने में समस्या आई") else: # Desktop fallback via ImageMagick (if available) try: subprocess.run(["import", path], check=True) speak("स्क्रीनशॉट लिया") except Exception: speak("स्क्रीनशॉट कमांड उपलब्ध नहीं")
-
-def camera_photo(): if not IS_TERMUX: speak("कैमरा केवल Termux/Android पर उपलब्ध") return path = f"/sdcard/camera_{int(time.time())}.jpg" ok, _ = termux_cmd(["termux-camera-photo", path], "camera_photo") speak("फोटो ले ली गई" if ok else "कैमरा खोलने में समस्या")
-
-def set_volume(level: int): if not IS_TERMUX: speak("वॉल्यूम परिवर्तन Ubuntu/Desktop पर समर्थित नहीं") return ok, _ = termux_cmd(["termux-volume", "music", str(level)], f"volume_{level}") if ok: if level == 0: speak("वॉल्यूम म्यूट कर दिया गया") elif level >= 12: speak("वॉल्यूम पूरा बढ़ा दिया गया") else: speak("वॉल्यूम सेट कर दिया गया") else: speak("वॉल्यूम बदलने में समस्या आई")
-
-def lock_device(): if not IS_TERMUX: speak("लॉक केवल Android/Termux पर") return ok, _ = termux_cmd(["termux-lock"], "lock") speak("फोन लॉक हो गया" if ok else "लॉक करने में समस्या")
-
-def unlock_device(): if not IS_TERMUX: speak("अनलॉक केवल Android/Termux पर") return ok, _ = termux_cmd(["termux-wake-unlock"], "unlock") speak("फोन अनलॉक हो गया" if ok else "अनलॉक करने में समस्या")
-
-def open_app(name_raw: str): if not IS_TERMUX: speak("ऐप खोलना केवल Android/Termux पर") return False mapping = load_json(APP_MAP_FILE, DEFAULT_APP_MAP.copy()) key = (name_raw or "").strip().lower() pkg = mapping.get(key) if not pkg: push_suggest_fix(f"open_app:{key}", "Add package mapping in app_mapping.json") speak(f"{name_raw} mapping missing — CONFIRM कर के placeholder जोड़ो") return False # Attempt via Activity (best effort, actual activity may vary) ok, _ = termux_cmd(["am","start","-n", f"{pkg}/.MainActivity"], f"open_app_{key}") speak(f"{name_raw} खोल दिया" if ok else f"{name_raw} नहीं खुल पाया") return ok
-
-───────────────────────── Suggestions / Analyze ─────────────────────────
-
-def push_suggest_fix(command, suggestion): arr = load_json(SUGGESTED_FIXES, []) arr.append({"time": time.time(), "command": command, "suggestion": suggestion}) save_json(SUGGESTED_FIXES, arr)
-
-def analyze(): data = load_json(FEEDBACK_FILE, []) fails = [d for d in data if d.get("status") == "fail"] if not fails: return counts = Counter([f.get("command") for f in fails]) if not counts: return most, cnt = counts.most_common(1)[0] if cnt >= 3: speak(f"ध्यान दें: '{most}' बार‑बार फेल हो रहा है — CONFIRM टाइप करके placeholder जोड़ें") push_suggest_fix(most, "Recurring failure; check mapping/permissions")
-
-───────────────────────── Safety / Pentest Flow ─────────────────────────
-
-DANGEROUS_KEYWORDS = [ "exploit","ddos","reverse shell","rootkit","attack","payload","crack", "hydra","sqlmap","metasploit","subfinder","ffuf","port scan","scan subnet" ]
-
-def contains_dangerous(text): t = (text or "").lower() return any(kw in t for kw in DANGEROUS_KEYWORDS)
-
-def is_valid_hostname_or_ip(s): return bool(re.match(r"^\d{1,3}(?:.\d{1,3}){3}$", s) or re.match(r"^[a-z0-9.-]{1,253}$", s, re.I))
-
-def verify_invite_token(target, token): wl = load_json(WHITELIST_FILE, {}) return target in wl and wl[target].get("token") == token
-
-def require_typed_confirmation(timeout_seconds=60): print("Dangerous action requested. TYPE: CONFIRM: YES") speak("ध्यान दें: खतरनाक कार्रवाई के लिए टाइप करके पुष्टि करिए — CONFIRM: YES") start = time.time() try: while time.time() - start < timeout_seconds: if sys.stdin in select_readable(0.5): return input().strip() == "CONFIRM: YES" except Exception: pass return False
-
-def select_readable(timeout): import select r, _, _ = select.select([sys.stdin], [], [], timeout) return r
-
-def run_approved_action(action_name, target=None, extra_args=None): approved = load_json(APPROVED_CMDS_FILE, {}) if action_name not in approved: return False, f"Action '{action_name}' not found" base = approved[action_name] final = [] for part in base: if "{target}" in part: if not target or not is_valid_hostname_or_ip(target): return False, "Invalid/no target" final.append(part.replace("{target}", target)) else: final.append(part) if extra_args: final += extra_args audit_log({"phase": "pre-exec", "action": action_name, "cmd": final, "target": target}) try: proc = subprocess.run(final, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True, timeout=300) out = proc.stdout ok = True except subprocess.CalledProcessError as e: out = (e.stderr or str(e)) ok = False audit_log({"phase": "post-exec", "action": action_name, "cmd": final, "target": target, "success": ok, "stdout_snippet": (out or "")[:1000]}) return ok, out
-
-───────────────────────── Trading helper ─────────────────────────
-
-def get_coin_price(coin_id="bitcoin", vs_currency="usd"): try: r = requests.get( f"https://api.coingecko.com/api/v3/simple/price", params={"ids": coin_id, "vs_currencies": vs_currency, "include_24hr_change": True}, timeout=10) return r.json().get(coin_id, {}) except Exception: return {}
-
-def trading_suggestion_for_btc(): data = get_coin_price("bitcoin","usd") if not data: return "Market data unavailable right now." price = data.get("usd") change24 = data.get("usd_24h_change", 0) trend = "up" if (change24 or 0) > 0 else "down" sl_pct = 0.01 if trend == "up" else 0.02 entry = float(price) sl = round(entry*(1 - sl_pct), 2) tp = round(entry*(1 + 0.03), 2) return f"BTC price ${entry:.2f}, 24h change {change24:.2f}%. Suggested entry ${entry:.2f}, stop-loss ${sl:.2f}, take-profit ${tp:.2f} (trend {trend})."
-
-───────────────────────── HF helper (optional) ─────────────────────────
-
-def hf_query(prompt, max_tokens=180): if not HF_API_KEY: return None, "no_token" headers = {"Authorization": f"Bearer {HF_API_KEY}"} payload = {"inputs": prompt, "parameters": {"max_new_tokens": max_tokens, "temperature": 0.1}} try: resp = requests.post(HF_API_URL, headers=headers, json=payload, timeout=30) if resp.status_code != 200: return None, f"HF {resp.status_code}: {resp.text[:200]}" j = resp.json() if isinstance(j, list) and j and isinstance(j[0], dict) and "generated_text" in j[0]: return j[0]["generated_text"], None if isinstance(j, dict) and "generated_text" in j: return j["generated_text"], None return str(j)[:1000], None except Exception as e: return None, str(e)
-
-───────────────────────── Intent normalizer ─────────────────────────
-
-TRIGGERS = { "kaise ho abhi": [ "main theek hoon, ekdum mast 😎", "ARVIND, main bilkul badhiya hoon! tum kaise ho?" ] } FALLBACKS = [ "ARVIND, main samajh nahi paya — phir se bol do?", "ek minute — yeh mujhe clear nahi hua. Dobara bolo, please." ]
-
-def is_trigger(text): t = (text or "").strip().lower() for k in TRIGGERS: if k in t: return k return None
-
-def smalltalk_reply(text): key = is_trigger(text) if key: return TRIGGERS[key][0] low = (text or "").lower() if any(w in low for w in ("hello","hi","hey","namaste","salam")): return "Namaste ARVIND! kaise ho?" return None
-
-def normalize_and_intent(text): if contains_dangerous(text): return ("DANGEROUS", None) t = (text or "").lower() # local intents (fast) if any(x in t for x in ["screenshot","स्क्रीनशॉट","screen shot"]): return ("SCREENSHOT", None) if any(x in t for x in ["lock","लॉक"]): return ("LOCK", None) if any(x in t for x in ["unlock","अनलॉक"]): return ("UNLOCK", None) if any(x in t for x in ["camera","कैमरा","photo","फोटो"]): return ("CAMERA", None) if any(x in t for x in ["volume","वॉल्यूम","आवाज़","आवाज"]): if any(x in t for x in ["increase","बढ़ा","फुल","up","ऊपर"]): return ("VOLUME_UP", None) if any(x in t for x in ["decrease","कम","down","घटा"]): return ("VOLUME_DOWN", None) if "mute" in t or "म्यूट" in t: return ("VOLUME_MUTE", None) if any(x in t for x in ["time","समय","टाइम"]): return ("TIME", None) if ("battery" in t) or ("बैटरी" in t): return ("BATTERY", None) if ("खोलो" in t) or ("open" in t): app_name = t.replace("खोलो"," ").replace("open"," ").strip() return ("OPEN_APP", app_name) if any(x in t for x in ["bitcoin","btc","buy bitcoin"]): return ("TRADE_ADVICE", "bitcoin") if any(x in t for x in ["scan","port scan","run scan","run port"]): m = re.search(r"((?:\d{1,3}.){3}\d{1,3})|([a-z0-9.-]+.[a-z]{2,})", t) tgt = m.group(0) if m else None return ("AUTHORIZED_SCAN", tgt) return ("UNKNOWN", text)
-
-───────────────────────── STT (Voice) ─────────────────────────
-
-LISTEN_SECONDS = 7
-
-try: import speech_recognition as sr except Exception: sr = None
-
-def listen_google_stt(timeout=LISTEN_SECONDS, phrase_limit=LISTEN_SECONDS): if not sr: return "" try: r = sr.Recognizer() with sr.Microphone() as source: r.adjust_for_ambient_noise(source, duration=0.8) print("सुन रहा हूँ... (Google STT)") audio = r.listen(source, timeout=timeout, phrase_time_limit=phrase_limit) try: return r.recognize_google(audio, language='hi-IN') except sr.UnknownValueError: try: return r.recognize_google(audio, language='en-US') except Exception: return "" except Exception as e: print("[listen]", e) return ""
-
-def listen_vosk_offline(): try: from vosk import Model, KaldiRecognizer import pyaudio except Exception: return "" model_path = "vosk-model-small-hi-0.22" if not os.path.exists(model_path): return "" wf_rate = 16000 model = Model(model_path) rec = KaldiRecognizer(model, wf_rate) p = pyaudio.PyAudio() stream = p.open(format=pyaudio.paInt16, channels=1, rate=wf_rate, input=True, frames_per_buffer=8000) stream.start_stream() print("सुन रहा हूँ... (Vosk offline)") while True: data = stream.read(4000, exception_on_overflow=False) if rec.AcceptWaveform(data): res = json.loads(rec.Result()) return res.get("text", "")
-
-───────────────────────── Mode Runners ─────────────────────────
-
-def handle_intent(intent, meta, original_text): if intent == "DANGEROUS": speak("माफ़ कीजिए — मैं यह काम करने में मदद नहीं कर सकता।") log_feedback(original_text, "blocked", "dangerous") save_memory(original_text, "blocked_dangerous") return
-
-if intent == "SCREENSHOT":
-    take_screenshot(); save_memory(original_text, "screenshot"); return
-if intent == "LOCK":
-    lock_device(); save_memory(original_text, "lock"); return
-if intent == "UNLOCK":
-    unlock_device(); save_memory(original_text, "unlock"); return
-if intent == "CAMERA":
-    camera_photo(); save_memory(original_text, "camera"); return
-if intent == "VOLUME_UP":
-    set_volume(15); save_memory(original_text, "volume_up"); return
-if intent == "VOLUME_DOWN":
-    set_volume(3); save_memory(original_text, "volume_down"); return
-if intent == "VOLUME_MUTE":
-    set_volume(0); save_memory(original_text, "volume_mute"); return
-if intent == "TIME":
-    speak(time.strftime("अभी समय है %H:%M:%S")); save_memory(original_text, "time"); return
-if intent == "BATTERY":
+class LogStore:
+    """Append‑only JSONL stream with batched flush, rotation and compaction.
+
+    keep_records: retention window — oldest whole segments are dropped once the
+    newer ones still hold at least this many records (memory: MEMORY_KEEP_RECORDS).
+    legacy_path/legacy_key: old whole‑file JSON list, migrated on first open.
+    """
+
+    def __init__(self, name, keep_records=None, segment_records=None,
+                 segment_bytes=LOG_SEGMENT_BYTES, segment_age=LOG_SEGMENT_AGE,
+                 legacy_path=None, legacy_key=None):
+        self.name = name
+        self.dir = os.path.join(STREAMS_DIR, name)
+        self.keep_records = keep_records
+        self.segment_records = segment_records
+        self.segment_bytes = segment_bytes
+        self.segment_age = segment_age
+        self.legacy_path = legacy_path
+        self.legacy_key = legacy_key
+        self._lock = threading.Lock()       # guards _pending
+        self._io = threading.RLock()        # guards segments/meta/files
+        self._pending = []
+        self._segments = []                 # [[seq, records, bytes]] oldest first, last = active
+        self._meta = {}
+        self._readers = 0
+        self._next = 0                      # absolute position of the next appended record
+        self._opened = False
+
+    # ---- paths / meta ----
+    def _seg_path(self, seq):
+        return os.path.join(self.dir, f"{seq:08d}.jsonl")
+
+    def _meta_path(self):
+        return os.path.join(self.dir, "meta.json")
+
+    def _save_meta(self):
+        save_json_atomic(self._meta_path(), self._meta)
+
+    def _open(self):
+        if self._opened:
+            return
+        with self._io:
+            if self._opened:
+                return
+            os.makedirs(self.dir, exist_ok=True)
+            self._meta = load_json(self._meta_path(), {})
+            self._meta.setdefault("base", 0)        # records dropped by retention
+            self._meta.setdefault("cursors", {})
+            for fn in sorted(os.listdir(self.dir)):
+                if fn.endswith(".jsonl") and fn[:-6].isdigit():
+                    path = os.path.join(self.dir, fn)
+                    self._segments.append([int(fn[:-6]), _count_lines(path), os.path.getsize(path)])
+            if self._segments:
+                seg = self._segments[-1]  # the only segment ever appended to
+                _truncate_torn_tail(self._seg_path(seg[0]))
+                seg[2] = os.path.getsize(self._seg_path(seg[0]))
+            else:
+                self._migrate_legacy()
+            if not self._segments:
+                self._segments.append([1, 0, 0])
+            self._meta.setdefault("active_since", time.time())
+            self._save_meta()
+            self._next = self._meta["base"] + sum(s[1] for s in self._segments)
+            self._opened = True
+
+    def _migrate_legacy(self):
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        data = load_json(self.legacy_path, None)
+        if isinstance(data, dict) and self.legacy_key:
+            data = data.get(self.legacy_key, [])
+        if not isinstance(data, list):
+            return
+        self._segments.append([1, 0, 0])
+        self._write_records(data)
+        self._apply_retention()
+        try:
+            os.replace(self.legacy_path, self.legacy_path + ".migrated")
+        except Exception:
+            pass
+        print(f"[logstore] migrated {len(data)} records from {os.path.basename(self.legacy_path)}")
+
+    # ---- write path ----
+    def append(self, rec: dict):
+        """Buffer rec for the writer; returns its absolute stream position."""
+        self._open()
+        with self._lock:
+            self._pending.append(rec)
+            n = len(self._pending)
+            pos, self._next = self._next, self._next + 1
+        LOG_WRITER.kick(urgent=n >= LOG_FLUSH_BATCH)
+        return pos
+
+    def flush(self, fsync=True):
+        if not self._opened:
+            return
+        with self._io:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if batch:
+                self._write_records(batch, fsync=fsync)
+            self._maybe_rotate()
+
+    def _write_records(self, records, fsync=True):
+        # Caller holds self._io. Splits across segments when a rotation limit is hit.
+        lines = [json.dumps(r, ensure_ascii=False) + "\n" for r in records]
+        i = 0
+        while i < len(lines):
+            seg = self._segments[-1]
+            room = len(lines) - i
+            if self.segment_records:
+                room = min(room, max(self.segment_records - seg[1], 0))
+            chunk, size = [], 0
+            for ln in lines[i:i + room]:
+                b = len(ln.encode("utf-8"))
+                if (chunk or seg[1]) and seg[2] + size + b > self.segment_bytes:
+                    break
+                chunk.append(ln); size += b
+            if not chunk:
+                self._rotate()
+                continue
+            with open(self._seg_path(seg[0]), "a", encoding="utf-8") as f:
+                f.write("".join(chunk))
+                f.flush()
+                if fsync:
+                    os.fsync(f.fileno())
+            seg[1] += len(chunk); seg[2] += size
+            i += len(chunk)
+
+    def _maybe_rotate(self):
+        seg = self._segments[-1]
+        if not seg[1]:
+            return
+        if (seg[2] >= self.segment_bytes
+                or (self.segment_records and seg[1] >= self.segment_records)
+                or time.time() - self._meta.get("active_since", 0) >= self.segment_age):
+            self._rotate()
+
+    def _rotate(self):
+        self._segments.append([self._segments[-1][0] + 1, 0, 0])
+        self._meta["active_since"] = time.time()
+        self._apply_retention()
+        if len(self._segments) - 1 > LOG_MAX_SEGMENTS:
+            self.compact()
+        self._save_meta()
+
+    def _apply_retention(self):
+        if not self.keep_records:
+            return
+        total = sum(s[1] for s in self._segments)
+        while len(self._segments) > 1 and total - self._segments[0][1] >= self.keep_records:
+            seq, n, _ = self._segments.pop(0)
+            total -= n
+            self._meta["base"] += n
+            try:
+                os.remove(self._seg_path(seq))
+            except Exception:
+                pass
+
+    def compact(self):
+        """Merge adjacent small rotated segments (up to segment_bytes each)."""
+        with self._io:
+            if self._readers:
+                return  # a streaming reader holds segment paths; retry next rotation
+            rotated, merged = self._segments[:-1], []
+            for seg in rotated:
+                last = merged[-1] if merged else None
+                if (last and last[2] + seg[2] <= self.segment_bytes
+                        and (not self.segment_records or last[1] + seg[1] <= self.segment_records)):
+                    last[-1].append(seg)
+                    last[1] += seg[1]; last[2] += seg[2]
+                else:
+                    merged.append([seg[0], seg[1], seg[2], [seg]])
+            for group in merged:
+                parts = group[3]
+                if len(parts) == 1:
+                    continue
+                # the merged file takes the newest seq so ordering is preserved
+                dst, tmp = self._seg_path(parts[-1][0]), self._seg_path(parts[-1][0]) + ".tmp"
+                with open(tmp, "wb") as out:
+                    for seq, _, _ in parts:
+                        with open(self._seg_path(seq), "rb") as src:
+                            out.write(src.read())
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.replace(tmp, dst)
+                for seq, _, _ in parts[:-1]:
+                    try:
+                        os.remove(self._seg_path(seq))
+                    except Exception:
+                        pass
+            self._segments = [[g[3][-1][0], g[1], g[2]] for g in merged] + self._segments[-1:]
+
+    # ---- read path ----
+    def iter_records(self):
+        """Stream every record oldest → newest without loading the stream."""
+        self._open()
+        self.flush(fsync=False)
+        with self._io:
+            seqs = [s[0] for s in self._segments]
+            self._readers += 1
+        try:
+            for seq in seqs:
+                yield from _read_jsonl(self._seg_path(seq))
+        finally:
+            with self._io:
+                self._readers -= 1
+
+    def iter_from(self, start=0):
+        """(position, record) for every record at absolute position >= start;
+        whole segments before start are skipped without being read."""
+        self._open()
+        self.flush(fsync=False)
+        with self._io:
+            pos = self._meta["base"]
+            segs = [(s[0], s[1]) for s in self._segments]
+            self._readers += 1
+        try:
+            for seq, count in segs:
+                if pos + count <= start:
+                    pos += count
+                    continue
+                try:
+                    f = open(self._seg_path(seq), "r", encoding="utf-8")
+                except FileNotFoundError:
+                    pos += count  # dropped by retention meanwhile
+                    continue
+                with f:
+                    for line in f:
+                        if pos >= start:
+                            try:
+                                rec = json.loads(line)
+                            except Exception:
+                                rec = None  # torn/partial line still occupies a position
+                            if rec is not None:
+                                yield pos, rec
+                        pos += 1
+        finally:
+            with self._io:
+                self._readers -= 1
+
+    def tail(self, n):
+        """Last n records, reading only the newest segments."""
+        self._open()
+        self.flush(fsync=False)
+        out = []
+        with self._io:
+            for seq, _, _ in reversed(self._segments):
+                recs = list(_read_jsonl(self._seg_path(seq)))
+                out[:0] = recs[-(n - len(out)):] if n > len(out) else []
+                if len(out) >= n:
+                    break
+        return out
+
+    def pop(self, cursor):
+        """Queue‑style read: first record past the named cursor, advancing it."""
+        self._open()
+        self.flush(fsync=False)
+        with self._io:
+            base = self._meta["base"]
+            pos = max(self._meta["cursors"].get(cursor, 0), base)
+            skip = pos - base
+            for seq, count, _ in self._segments:
+                if skip >= count:
+                    skip -= count
+                    continue
+                with open(self._seg_path(seq), "r", encoding="utf-8") as f:
+                    for i, line in enumerate(f):
+                        if i < skip:
+                            continue
+                        pos += 1
+                        try:
+                            rec = json.loads(line)
+                        except Exception:
+                            continue
+                        self._meta["cursors"][cursor] = pos
+                        self._save_meta()
+                        return rec
+                skip = 0
+            self._meta["cursors"][cursor] = pos
+            self._save_meta()
+            return None
+
+class _LogWriter:
+    """Single daemon thread that flushes every registered LogStore in batches."""
+
+    def __init__(self):
+        self.stores = []
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._last = {}      # store name → monotonic time of its last periodic flush
+
+    def register(self, store):
+        self.stores.append(store)
+        return store
+
+    def kick(self, urgent=False):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                    self._thread.start()
+        if urgent:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(LOG_FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush_all(periodic=True)
+
+    def flush_all(self, fsync=True, periodic=False):
+        # stores with a flush_interval (big snapshots) are only saved that often
+        # by the background loop, stores with flush_due() only when it says so;
+        # exit paths (periodic=False) always flush them
+        now = time.monotonic()
+        for s in self.stores:
+            every = getattr(s, "flush_interval", 0)
+            due = getattr(s, "flush_due", None)
+            if periodic and ((every and now - self._last.get(s.name, float("-inf")) < every)
+                             or (due and not due())):
+                continue
+            self._last[s.name] = now
+            try:
+                s.flush(fsync=fsync)
+            except Exception as e:
+                print("[logstore]", s.name, e)
+
+LOG_WRITER    = _LogWriter()
+FEEDBACK_LOG  = LOG_WRITER.register(LogStore("feedback", legacy_path=FEEDBACK_FILE))
+USAGE_LOG     = LOG_WRITER.register(LogStore("usage", legacy_path=USAGE_FILE))
+MEMORY_LOG    = LOG_WRITER.register(LogStore("memory", keep_records=MEMORY_KEEP_RECORDS, segment_records=1000,
+                                             legacy_path=MEMORY_FILE, legacy_key="conversations"))
+FIXES_LOG     = LOG_WRITER.register(LogStore("suggested_fixes", legacy_path=SUGGESTED_FIXES))
+atexit.register(LOG_WRITER.flush_all)
+
+# ───────────────────────── Speech / Mic detect ─────────────────────────
+def list_input_devices_sounddevice():
+    try:
+        import sounddevice as sd
+        devs = sd.query_devices()
+        return [d for d in devs if d.get('max_input_channels', 0) > 0]
+    except Exception:
+        return []
+
+def any_microphone_available():
+    # Try sounddevice first
+    if list_input_devices_sounddevice():
+        return True
+    # Fallback: SpeechRecognition device list
+    try:
+        import speech_recognition as sr
+        names = sr.Microphone.list_microphone_names()
+        return bool(names)
+    except Exception:
+        return False
+
+def is_inside_proot_like_linux():
+    # Heuristic: Linux, AND /system/bin exists (Android root visible), but not Termux PREFIX
+    if IS_TERMUX:
+        return False
+    if platform.system().lower() == "linux" and os.path.exists("/system/bin"):
+        return True
+    return False
+
+def termux_python_path():
+    # Common Termux python locations
+    candidates = [
+        "/data/data/com.termux/files/usr/bin/python",
+        "/data/data/com.termux/files/usr/bin/python3"
+    ]
+    for c in candidates:
+        if os.path.exists(c):
+            return c
+    return None
+
+def try_relaunch_in_termux(script_path: str, extra_args=None):
+    """Attempt to relaunch this script under Termux's Python if available.
+    Works best when the script lives in /sdcard (shared storage).
+    """
+    py = termux_python_path()
+    if not py:
+        return False, "termux python not found"
+    if not os.path.exists(script_path):
+        return False, "script not visible at given path"
+    cmd = [py, script_path]
+    if extra_args:
+        cmd += extra_args
+    try:
+        subprocess.Popen(cmd)
+        return True, "spawned"
+    except Exception as e:
+        return False, str(e)
+
+# ───────────────────────── TTS / Notify ─────────────────────────
+PRIO_ALERT, PRIO_NORMAL, PRIO_STATUS = 0, 1, 2   # lower plays first
+SPEECH_STATUS_TTL = 1.5    # seconds a queued status line ("सोच रहा हूँ…") stays worth saying
+SPEECH_BARGE_IN   = False  # opt‑in: listen while replies are still queued instead of after the
+                           # queue drains. The mic is muted while an utterance actually plays (no
+                           # echo cancellation: our own "फोन लॉक हो गया" would re‑trigger LOCK), so
+                           # only a typed command (text mode) can cut a reply short
+SPEECH_EXIT_WAIT  = 15     # seconds to let queued speech finish at exit
+
+class Utterance:
+    """Wait handle returned by speak()."""
+
+    def __init__(self, text, priority, status):
+        self.text, self.priority, self.status = text, priority, status
+        self.created = time.time()
+        turn = _TURN.get()
+        self.intent = turn.intent if turn else None   # TTS timings are recorded under it
+        self.spoken = False
+        self.interrupted = False
+        self.done = threading.Event()
+
+    def _finish(self, spoken):
+        self.spoken = spoken
+        self.done.set()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+class SpeechWorker:
+    """Single thread that owns the TTS engine and plays a priority queue.
+
+    Status lines are coalesced (a newer one replaces a queued one) and
+    dropped once stale or once real output has been queued after them.
+    interrupt() drops queued speech and cuts the current utterance.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._cv = threading.Condition()
+        self._seq = itertools.count()
+        self._current = None
+        self._last_output = -1     # seq of the newest non-status utterance
+        self._engine = None        # pyttsx3 engine (desktop), False if unavailable
+        self._proc = None          # termux-tts-speak process being played
+        self._thread = None
+
+    def say(self, text, priority=PRIO_NORMAL, status=False):
+        u = Utterance(text, priority, status)
+        with self._cv:
+            u.seq = next(self._seq)
+            if status:
+                for _, _, old in self._heap:
+                    if old.status:
+                        old._finish(False)
+            else:
+                self._last_output = u.seq
+            heapq.heappush(self._heap, (priority, u.seq, u))
+            self._cv.notify_all()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+                self._thread.start()
+        return u
+
+    def _pending(self):
+        return [u for _, _, u in self._heap if not u.done.is_set()]
+
+    def _next(self):
+        with self._cv:
+            while True:
+                while not self._heap:
+                    self._cv.wait()
+                _, _, u = heapq.heappop(self._heap)
+                if u.done.is_set():
+                    continue  # coalesced or interrupted while queued
+                if u.status and (time.time() - u.created > SPEECH_STATUS_TTL
+                                 or self._last_output > u.seq):
+                    u._finish(False)
+                    self._cv.notify_all()
+                    continue
+                self._current = u
+                return u
+
+    def _run(self):
+        while True:
+            u = self._next()
+            t0 = time.perf_counter()
+            TELEMETRY.record(u.intent, "tts_queue", time.time() - u.created)
+            try:
+                self._play(u.text)
+            except Exception:
+                pass
+            TELEMETRY.record(u.intent, "tts_play", time.perf_counter() - t0)
+            with self._cv:
+                self._current = None
+                u._finish(not u.interrupted)
+                self._cv.notify_all()
+
+    def _play(self, text):
+        if IS_TERMUX:
+            self._proc = subprocess.Popen(["termux-tts-speak", "-l", "hi", text])
+            try:
+                self._proc.wait()
+            finally:
+                self._proc = None
+            return
+        if self._engine is None:
+            try:
+                import pyttsx3
+                self._engine = pyttsx3.init()
+            except Exception:
+                self._engine = False
+        if self._engine:
+            self._engine.say(text)
+            self._engine.runAndWait()
+
+    def interrupt(self, keep_alerts=True):
+        """Drop queued speech and stop the current utterance (new command arrived)."""
+        keep = lambda u: keep_alerts and u.priority == PRIO_ALERT
+        with self._cv:
+            for u in self._pending():
+                if not keep(u):
+                    u._finish(False)
+            self._heap = [e for e in self._heap if not e[2].done.is_set()]
+            heapq.heapify(self._heap)
+            cur = self._current
+            self._cv.notify_all()
+        if cur and not keep(cur):
+            cur.interrupted = True
+            try:
+                if self._proc:
+                    self._proc.terminate()
+                elif self._engine:
+                    self._engine.stop()
+            except Exception:
+                pass
+
+    @property
+    def speaking(self):
+        return self._current is not None
+
+    def wait_idle(self, timeout=None):
+        with self._cv:
+            return self._cv.wait_for(lambda: self._current is None and not self._pending(), timeout)
+
+SPEECH = SpeechWorker()
+atexit.register(lambda: SPEECH.wait_idle(SPEECH_EXIT_WAIT))
+
+def speak(text: str, priority=PRIO_NORMAL, status=False, wait=False):
+    """Print now, queue the audio and return immediately (Utterance handle).
+    wait=True blocks until it has been played (or dropped)."""
+    cap = _REPLY_CAPTURE.get()
+    if cap is not None:  # daemon request: collect replies for the JSON result
+        if not status:
+            cap["replies"].append(text)
+        if cap["quiet"]:
+            u = Utterance(text, priority, status)
+            u._finish(False)
+            return u
+    with span("speak"):
+        print(f"{ASSISTANT_NAME}: {text}")
+        u = SPEECH.say(text, priority=priority, status=status)
+    if wait:
+        u.wait()
+    return u
+
+def notify(text: str):
     if IS_TERMUX:
         try:
-            out = subprocess.check_output(["dumpsys","battery"], text=True)
-            m = re.search(r"level: (\d+)", out)
-            level = m.group(1) if m else "unknown"
-            speak(f"बैटरी {level}% है")
+            subprocess.run(["termux-notification", "--title", ASSISTANT_NAME, "--content", text], check=False)
         except Exception:
-            speak("बैटरी लेवल नहीं मिला")
+            pass
+
+# ───────────────────────── Logging / Memory / Audit ─────────────────────────
+def audit_log(entry: dict):
+    rec = {"ts": time.time(), "human_time": time.ctime(), **entry}
+    try:
+        with span("log"):
+            os.makedirs(LOG_DIR, exist_ok=True)
+            with open(AUDIT_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    except Exception:
+        pass
+
+def log_feedback(cmd, status, details=""):
+    now = time.time()
+    with span("log"):
+        # stats first: a first‑run rebuild from FEEDBACK_LOG must not already contain this record
+        FAIL_STATS.record(cmd, status, now)
+        FEEDBACK_LOG.append({"time": now, "human_time": time.ctime(now), "command": cmd, "status": status, "details": details})
+
+def log_usage(cmd):
+    with span("log"):
+        USAGE_LOG.append({"time": time.time(), "command": cmd})
+
+def save_memory(user, assistant, kind=None):
+    # kind tags replayable answers ("hf"); MEMORY_INDEX serves those as a cache
+    rec = {"time": time.time(), "human_time": time.ctime(), "user": user, "assistant": assistant}
+    if kind:
+        rec["kind"] = kind
+    with span("log"):
+        MEMORY_INDEX.append(rec)
+
+# ───────────────────────── Memory index (answer cache) ─────────────────────────
+MEMORY_INDEX_FILE      = os.path.join(LOG_DIR, "memory_index.json")
+MEMORY_INDEX_VERSION   = 1                # bump when memory_tokens() changes → rebuild
+MEMORY_INDEX_SAVE_DOCS = 1000             # snapshot after this many new conversations (one memory segment) and on exit
+MEMORY_CACHEABLE       = ("hf",)          # save_memory kinds whose answers may be replayed
+MEMORY_CACHE_MAX       = 2000             # replayable answers kept (least recently used evicted)
+MEMORY_CACHE_TTL       = 7 * 24 * 3600    # never replay answers older than this
+MEMORY_CACHE_MIN_SIM   = 0.8              # term‑set Jaccard needed for a non‑exact hit (1.0 = exact only)
+MEMORY_CACHE_NEGATIONS = {"not", "no", "nahi", "nahin", "mat", "never", "t",
+                          "नहीं", "नही", "मत", "ना", "न"}  # extra terms that flip a cached answer
+MEMORY_BM25_K1         = 1.2
+MEMORY_BM25_B          = 0.75
+
+_MEM_TOKEN_RE = re.compile(r"(?:[^\W_]|[\u0900-\u0963\u0966-\u097f])+")  # words incl. Devanagari matras
+_MEM_FOLD     = str.maketrans({"\u093c": None,        # nukta: आवाज़ == आवाज
+                               "\u0901": "\u0902"})   # chandrabindu → anusvara
+
+def memory_tokens(text):
+    """Normalized hi/en terms: NFKC + casefold, nukta/chandrabindu folded,
+    split on anything that isn't a letter, digit or Devanagari sign."""
+    t = unicodedata.normalize("NFKC", text or "").casefold().translate(_MEM_FOLD)
+    return _MEM_TOKEN_RE.findall(t)
+
+class MemoryIndex:
+    """Inverted index over the memory stream, used as a local answer cache.
+
+    Postings (term → {doc: tf}) are updated per saved conversation, so the
+    stream is only read once — on the first build, or for records appended
+    after the last snapshot. Docs are keyed by their MEMORY_LOG position.
+    lookup() tries an exact normalized match (one dict hit), then ranks
+    candidates with BM25 and accepts the best that contains every query term
+    and every query bigram (word order), adds no negation, and overlaps the
+    query by MEMORY_CACHE_MIN_SIM. A near miss falls through to hf_query: a
+    slow answer beats a wrong one. Candidates come only from the postings of
+    the rarest query term, never from a full scan.
+
+    The snapshot is a whole‑file rewrite, so it is only taken every
+    MEMORY_INDEX_SAVE_DOCS new conversations and on exit; after a crash the
+    missing tail is re‑indexed from the stream.
+    """
+
+    def __init__(self, path, store, keep=MEMORY_KEEP_RECORDS):
+        self.name = "memory_index"
+        self.path = path
+        self.store = store
+        self.keep = keep
+        self._lock = threading.RLock()
+        self._docs = None               # pos → [text, terms, ts, answer|None], oldest first
+        self._post = {}                 # term → {pos: tf}
+        self._exact = {}                # " ".join(terms) → newest pos with an answer
+        self._answers = OrderedDict()   # positions holding a replayable answer, LRU first
+        self._total_len = 0
+        self._through = 0               # next stream position to index
+        self._saved_through = 0         # _through as of the last snapshot
+        self._dirty = False
+        self.stats = Counter()
+
+    def _load(self):
+        if self._docs is not None:
+            return
+        with self._lock:
+            if self._docs is not None:
+                return
+            docs = OrderedDict()
+            self._docs = docs
+            data = load_json(self.path, None)
+            if isinstance(data, dict) and data.get("version") == MEMORY_INDEX_VERSION:
+                for pos, text, terms, ts, answer in data.get("docs", []):
+                    self._insert(pos, text, terms, ts, answer)
+                for pos in data.get("lru", []):
+                    if pos in self._answers:
+                        self._answers.move_to_end(pos)
+                self._through = self._saved_through = data.get("through", 0)
+            n = len(docs)
+            for pos, rec in self.store.iter_from(self._through):
+                self._add_record(pos, rec)
+            self._dirty = len(docs) != n or not data
+
+    def warm(self):
+        """Build/load now (e.g. in the background at boot) instead of on first lookup."""
+        self._load()
+        return len(self._docs)
+
+    # ---- maintenance ----
+    def _add_record(self, pos, rec):
+        answer = rec.get("assistant") if rec.get("kind") in MEMORY_CACHEABLE else None
+        text = str(rec.get("user") or "")
+        self._insert(pos, text, memory_tokens(text), rec.get("time") or 0, answer or None)
+        self._through = max(self._through, pos + 1)
+
+    def _insert(self, pos, text, terms, ts, answer):
+        if not terms or pos in self._docs:
+            return
+        self._docs[pos] = [text, terms, ts, answer]
+        self._total_len += len(terms)
+        for term, tf in Counter(terms).items():
+            self._post.setdefault(term, {})[pos] = tf
+        if answer:
+            self._exact[" ".join(terms)] = pos
+            self._answers[pos] = None
+            while len(self._answers) > MEMORY_CACHE_MAX:
+                self._drop_answer(next(iter(self._answers)))
+                self.stats["evicted"] += 1
+        while len(self._docs) > self.keep:
+            self._remove(next(iter(self._docs)))
+
+    def _drop_answer(self, pos):
+        self._answers.pop(pos, None)
+        doc = self._docs.get(pos)
+        if doc and doc[3] is not None:
+            key = " ".join(doc[1])
+            if self._exact.get(key) == pos:
+                del self._exact[key]
+            doc[3] = None
+            self._dirty = True
+
+    def _remove(self, pos):
+        self._drop_answer(pos)
+        terms = self._docs.pop(pos)[1]
+        self._total_len -= len(terms)
+        for term in set(terms):
+            p = self._post.get(term)
+            if p is not None:
+                p.pop(pos, None)
+                if not p:
+                    del self._post[term]
+
+    def append(self, rec):
+        """Append rec to the stream and index it. Both happen under the index
+        lock, so concurrent saves reach add() in position order."""
+        with self._lock:
+            pos = self.store.append(rec)
+            self.add(pos, rec)
+        return pos
+
+    def add(self, pos, rec):
+        """Index a record just appended at stream position pos."""
+        with self._lock:
+            if self._docs is None:
+                return  # not loaded yet: the first load picks it up from the stream
+            if pos >= self._through:
+                self._add_record(pos, rec)
+                self._dirty = True
+
+    # ---- queries ----
+    def _bm25(self, terms, cands=None):
+        """{pos: score} for cands (default: every doc sharing a term)."""
+        N = len(self._docs)
+        if not N:
+            return {}
+        avg, k1, b = self._total_len / N, MEMORY_BM25_K1, MEMORY_BM25_B
+        scores = {} if cands is None else dict.fromkeys(cands, 0.0)
+        for term in set(terms):
+            p = self._post.get(term)
+            if not p:
+                continue
+            idf = math.log(1 + (N - len(p) + 0.5) / (len(p) + 0.5))
+            for pos in (p if cands is None else cands):
+                tf = p.get(pos)
+                if tf:
+                    dl = len(self._docs[pos][1])
+                    scores[pos] = scores.get(pos, 0.0) + idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avg))
+        return scores
+
+    def _fresh(self, pos, now):
+        if now - self._docs[pos][2] <= MEMORY_CACHE_TTL:
+            return True
+        self._drop_answer(pos)
+        return False
+
+    def _similar(self, terms, now):
+        if MEMORY_CACHE_MIN_SIM >= 1.0:
+            return None
+        q, qpairs = set(terms), set(zip(terms, terms[1:]))
+        # a hit must contain every query term, so the rarest one's postings hold all candidates
+        rare = min(q, key=lambda t: len(self._post.get(t, ())))
+        cands = {pos for pos in self._post.get(rare, ()) if pos in self._answers}
+        for score, pos in sorted(((s, p) for p, s in self._bm25(terms, cands).items()), reverse=True):
+            dterms = self._docs[pos][1]
+            d = set(dterms)
+            if (q <= d and len(q) / len(d) >= MEMORY_CACHE_MIN_SIM
+                    and not (d - q) & MEMORY_CACHE_NEGATIONS
+                    and qpairs <= set(zip(dterms, dterms[1:]))
+                    and self._fresh(pos, now)):
+                return pos
+        return None
+
+    def lookup(self, text, now=None):
+        """Cached answer for a question asked before, else None."""
+        terms = memory_tokens(text)
+        if not terms:
+            return None
+        self._load()
+        now = time.time() if now is None else now
+        with self._lock:
+            self.stats["lookups"] += 1
+            pos = self._exact.get(" ".join(terms))
+            if pos is not None and self._fresh(pos, now):
+                self.stats["exact"] += 1
+            else:
+                pos = self._similar(terms, now)
+                if pos is None:
+                    self.stats["misses"] += 1
+                    return None
+                self.stats["similar"] += 1
+            self._answers.move_to_end(pos)
+            self._dirty = True
+            return self._docs[pos][3]
+
+    def search(self, query, k=5):
+        """[(score, text, answer|None)] — the k best BM25 matches over all memory."""
+        terms = memory_tokens(query)
+        self._load()
+        with self._lock:
+            top = heapq.nlargest(k, self._bm25(terms).items(), key=lambda kv: kv[1]) if terms else []
+            return [(s, self._docs[p][0], self._docs[p][3]) for p, s in top]
+
+    def summary(self):
+        self._load()
+        with self._lock:
+            st = self.stats
+            hits = st["exact"] + st["similar"]
+            return {"docs": len(self._docs), "terms": len(self._post), "answers": len(self._answers),
+                    "lookups": st["lookups"], "hits": hits, "exact": st["exact"], "similar": st["similar"],
+                    "evicted": st["evicted"], "hit_rate": hits / st["lookups"] if st["lookups"] else 0.0}
+
+    def flush_due(self):
+        return self._docs is not None and self._through - self._saved_through >= MEMORY_INDEX_SAVE_DOCS
+
+    def flush(self, fsync=True):
+        with self._lock:
+            if not self._dirty or self._docs is None:
+                return
+            snap = {"version": MEMORY_INDEX_VERSION, "through": self._through,
+                    "docs": [[p, *d] for p, d in self._docs.items()], "lru": list(self._answers)}
+            self._dirty = False
+            self._saved_through = self._through
+        save_json_atomic(self.path, snap)
+
+MEMORY_INDEX = LOG_WRITER.register(MemoryIndex(MEMORY_INDEX_FILE, MEMORY_LOG))
+
+# ───────────────────────── Device actions (Termux) ─────────────────────────
+def termux_cmd(args, label, timeout=120):
+    try:
+        with span("device"):
+            proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout, check=True)
+        log_feedback(label, "success")
+        return True, proc.stdout
+    except subprocess.CalledProcessError as e:
+        log_feedback(label, "fail", e.stderr or str(e))
+        return False, e.stderr or str(e)
+    except Exception as e:
+        log_feedback(label, "fail", str(e))
+        return False, str(e)
+
+def take_screenshot():
+    os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+    path = os.path.join(SCREENSHOT_DIR, f"screenshot_{int(time.time())}.png")
+    if IS_TERMUX:
+        ok, _ = termux_cmd(["termux-screenshot", path], "screenshot")
+        speak("स्क्रीनशॉट ले लिया गया" if ok else "स्क्रीनशॉट लेने में समस्या आई")
     else:
-        speak("बैटरी info केवल Android/Termux पर")
-    save_memory(original_text, "battery"); return
-if intent == "OPEN_APP":
-    opened = open_app(meta); save_memory(original_text, f"open_app:{meta}:{opened}"); return
-if intent == "TRADE_ADVICE":
-    if meta == "bitcoin":
-        speak(trading_suggestion_for_btc()); save_memory(original_text, "trade_btc"); return
-if intent == "AUTHORIZED_SCAN":
-    target = meta
-    if not target:
-        speak("कृपया लक्ष्य बताइए — IP या domain."); return
-    if not is_valid_hostname_or_ip(target):
-        speak("लक्ष्य invalid है."); return
-    wl = load_json(WHITELIST_FILE, {})
-    if target not in wl:
-        speak("यह लक्ष्य whitelist में नहीं है — मालिक से invitation token लें.")
-        audit_log({"action":"scan_blocked","target":target,"reason":"not_whitelisted"})
-        return
-    speak("Owner invite token terminal में डालिए.")
-    token = input("Invite token: ").strip()
-    if not verify_invite_token(target, token):
-        speak("Token invalid. Aborting.")
-        audit_log({"action":"token_invalid","target":target})
-        return
-    if not require_typed_confirmation():
-        speak("Confirmation नहीं मिला — Aborting."); return
-    ok, out = run_approved_action("port_scan", target=target)
-    speak("Scan complete. Summary:" if ok else "Scan failed:")
-    if out:
-        for ln in (out[:300] if len(out) > 300 else out).splitlines()[:6]:
-            print(ln)
-    return
-
-# Unknown → smalltalk or HF
-st = smalltalk_reply(original_text)
-if st:
-    speak(st); save_memory(original_text, st); return
-speak("सोच रहा हूँ…")
-hf_out, err = hf_query(original_text)
-if hf_out:
-    trimmed = hf_out.strip()
-    speak(trimmed if len(trimmed) < 300 else trimmed[:300] + "…")
-    save_memory(original_text, trimmed)
-    log_feedback(original_text, "success", "hf_reply")
-else:
-    speak("समझ नहीं आया — क्या सरल शब्दों में बोलोगे?")
-    log_feedback(original_text, "fail", err or "hf_fail")
-    save_memory(original_text, "hf_fail")
-
-def run_voice_loop(): while True: try: text = listen_google_stt() if not text: text = listen_vosk_offline() if not text: continue print(f"तुम बोले: {text}") log_usage(text) intent, meta = normalize_and_intent(text) handle_intent(intent, meta, text) except KeyboardInterrupt: speak("सर्विस बंद कर रहा हूँ — बाय") break except Exception as e: print("[voice_loop]", e) time.sleep(0.8)
-
-def run_text_loop(): speak("Text mode चालू है. Type commands (exit/quit to stop)") while True: try: cmd = input("[ABHI] >>> ").strip() if not cmd: continue if cmd.lower() in ("exit","quit","bye"): speak("बाय 👋"); break log_usage(cmd) intent, meta = normalize_and_intent(cmd) handle_intent(intent, meta, cmd) except KeyboardInterrupt: speak("बाय 👋"); break except Exception as e: print("[text_loop]", e)
-
-───────────────────────── Updater Daemon ─────────────────────────
-
-def check_and_update(): if not UPDATE_URL: return try: r = requests.get(UPDATE_URL, timeout=10) if r.status_code != 200: return new_code = r.text with open(SELF_FILE, "r", encoding="utf-8") as f: cur = f.read() if new_code and new_code != cur: speak("नया संस्करण उपलब्ध — अपडेट कर रहा हूँ") with open(SELF_FILE, "w", encoding="utf-8") as f: f.write(new_code) speak("अपडेट पूरा — कृपया script दोबारा चलाएँ") except Exception: pass
-
-def updater_daemon(): while True: time.sleep(UPDATE_INTERVAL) check_and_update()
-
-───────────────────────── Boot / Auto‑mic + Auto‑switch ─────────────────────────
-
-def boot(auto_native_hint=False): # 1) updater threading.Thread(target=updater_daemon, daemon=True).start()
-
-# 2) greet + analyze hint
-speak("ABHI ready!")
-analyze()
-
-# 3) mic & environment
-mic_ok = any_microphone_available()
-env = "termux" if IS_TERMUX else ("linux-proot" if is_inside_proot_like_linux() else platform.system().lower())
-print(f"[ABHI] Env: {env} | Mic: {'yes' if mic_ok else 'no'}")
-
-if mic_ok:
-    run_voice_loop(); return
-
-# No mic available
-if not IS_TERMUX and is_inside_proot_like_linux() and not auto_native_hint:
-    # We are likely inside Ubuntu/proot on Android via Termux; attempt auto‑switch to Termux native
-    # Best effort: only works if this script is in /sdcard visible to Termux
-    sdcard_candidates = [SELF_FILE]
-    # If script not already in /sdcard, try to locate same name in /sdcard
-    base = os.path.basename(SELF_FILE)
-    if not SELF_FILE.startswith("/sdcard/"):
-        sdcard_candidates.append(f"/sdcard/{base}")
-    for candidate in sdcard_candidates:
-        ok, msg = try_relaunch_in_termux(candidate, extra_args=["--native"])
-        if ok:
-            speak("Mic नहीं — Termux native mode में स्विच कर रहा हूँ")
-            # Do not wait; exit current process to avoid double instances
-            time.sleep(1)
-            os._exit(0)
-    # If relaunch failed → fall through to text mode
-    print("[ABHI] Auto‑switch failed:", msg)
-
-# Final fallback: text mode
-speak("Mic नहीं मिला — Text mode पर शिफ्ट कर रहा हूँ")
-run_text_loop()
-
-───────────────────────── Argparse / Terminal helper ─────────────────────────
-
-def terminal_monitor(): while True: try: cmd = input().strip() if not cmd: continue C = cmd.upper() if C == "CONFIRM": suggested = load_json(SUGGESTED_FIXES, []) if not suggested: print("कोई suggested fixes नहीं है."); continue first = suggested.pop(0); save_json(SUGGESTED_FIXES, suggested) action = first.get("command", "") if action.startswith("open_app:"): app_name = action.split(":",1)[1] mapping = load_json(APP_MAP_FILE, DEFAULT_APP_MAP.copy()) mapping[app_name] = "com.example.placeholder" save_json(APP_MAP_FILE, mapping) print(f"Placeholder mapping added for '{app_name}'. Edit {APP_MAP_FILE} for real package.") speak(f"{app_name} के लिए placeholder जोड़ दिया — फ़ाइल एडिट करके सही package डाल देना") else: print("Applied safe non‑destructive suggestion (logged).") elif C == "ANALYZE": analyze(); print("Analyze complete.") elif C == "SHOWLOGS": fb = load_json(FEEDBACK_FILE, []) print("Recent feedback (last 10):") for e in fb[-10:]: print(e) elif C in ("EXIT","QUIT"): speak("सर्विस बंद कर रहा हूँ — बाय"); os._exit(0) else: print("Commands: CONFIRM, ANALYZE, SHOWLOGS, EXIT") except Exception as e: print("[term_mon]", e) time.sleep(0.5)
+        # Desktop fallback via ImageMagick (if available)
+        try:
+            subprocess.run(["import", path], check=True)
+            speak("स्क्रीनशॉट लिया")
+        except Exception:
+            speak("स्क्रीनशॉट कमांड उपलब्ध नहीं")
 
-def parse_args(): ap = argparse.ArgumentParser() ap.add_argument("--native", action="store_true", help="hint: running under Termux native") ap.add_argument("--command", help="run single normalized command in text mode then exit") return ap.parse_args()
+def camera_photo():
+    if not IS_TERMUX:
+        speak("कैमरा केवल Termux/Android पर उपलब्ध")
+        return
+    path = f"/sdcard/camera_{int(time.time())}.jpg"
+    ok, _ = termux_cmd(["termux-camera-photo", path], "camera_photo")
+    speak("फोटो ले ली गई" if ok else "कैमरा खोलने में समस्या")
 
-if name == "main": args = parse_args()
+def set_volume(level: int):
+    if not IS_TERMUX:
+        speak("वॉल्यूम परिवर्तन Ubuntu/Desktop पर समर्थित नहीं")
+        return
+    ok, _ = termux_cmd(["termux-volume", "music", str(level)], f"volume_{level}")
+    if ok:
+        if level == 0:
+            speak("वॉल्यूम म्यूट कर दिया गया")
+        elif level >= 12:
+            speak("वॉल्यूम पूरा बढ़ा दिया गया")
+        else:
+            speak("वॉल्यूम सेट कर दिया गया")
+    else:
+        speak("वॉल्यूम बदलने में समस्या आई")
 
-# Start terminal helper (so CONFIRM etc. work while voice/text loop runs)
-threading.Thread(target=terminal_monitor, daemon=True).start()
+def lock_device():
+    if not IS_TERMUX:
+        speak("लॉक केवल Android/Termux पर")
+        return
+    ok, _ = termux_cmd(["termux-lock"], "lock")
+    speak("फोन लॉक हो गया" if ok else "लॉक करने में समस्या")
 
-if args.command:
-    # one‑shot command execution (useful for bridges)
-    intent, meta = normalize_and_intent(args.command)
-    handle_intent(intent, meta, args.command)
-    sys.exit(0)
+def unlock_device():
+    if not IS_TERMUX:
+        speak("अनलॉक केवल Android/Termux पर")
+        return
+    ok, _ = termux_cmd(["termux-wake-unlock"], "unlock")
+    speak("फोन अनलॉक हो गया" if ok else "अनलॉक करने में समस्या")
+
+def open_app(name_raw: str):
+    if not IS_TERMUX:
+        speak("ऐप खोलना केवल Android/Termux पर")
+        return False
+    key = (name_raw or "").strip().lower()
+    pkg = APP_MAP.get().lookup(key)
+    if not pkg:
+        push_suggest_fix(f"open_app:{key}", "Add package mapping in app_mapping.json")
+        speak(f"{name_raw} mapping missing — CONFIRM कर के placeholder जोड़ो")
+        return False
+    # Attempt via Activity (best effort, actual activity may vary)
+    ok, _ = termux_cmd(["am","start","-n", f"{pkg}/.MainActivity"], f"open_app_{key}")
+    speak(f"{name_raw} खोल दिया" if ok else f"{name_raw} नहीं खुल पाया")
+    return ok
+
+# ───────────────────────── Suggestions / Analyze ─────────────────────────
+STATS_FILE            = os.path.join(LOG_DIR, "failure_stats.json")
+FAIL_WINDOW_SECONDS   = 15 * 60   # "last N minutes" failure rate
+FAIL_WINDOW_ATTEMPTS  = 20        # "last N attempts" failure rate
+FAIL_BUCKET_SECONDS   = 60        # time window granularity
+FAIL_MAX_COMMANDS     = 500       # per‑command entries kept (least recently seen evicted)
+FAIL_SAVE_SECS        = 30        # persist STATS_FILE at most this often (and on exit)
+
+class FailureStats:
+    """Running per‑command outcome counters, updated in O(1) per outcome.
+
+    Replaces rescanning feedback history: totals (success/fail/blocked),
+    a time window (per‑minute buckets) and an attempt window per command,
+    plus a pending‑fix flag used to deduplicate suggested fixes. Persisted
+    to STATS_FILE by the log writer; built once from the feedback stream
+    the first time it runs.
+
+    Every distinct command string gets an entry (UNKNOWN utterances too),
+    so the table is capped at FAIL_MAX_COMMANDS: the least recently seen
+    command without a pending fix is evicted; the "*" aggregate keeps the
+    overall totals.
+    """
+
+    ALL = "*"  # aggregate over every command
+
+    def __init__(self, path):
+        self.name = "failure_stats"
+        self.path = path
+        self.flush_interval = FAIL_SAVE_SECS
+        self._lock = threading.RLock()
+        self._cmds = None       # OrderedDict, least recently seen first
+        self._dirty = False
+
+    def _entry(self, cmd):
+        e = self._cmds.get(cmd)
+        if e is None:
+            e = self._cmds[cmd] = {"success": 0, "fail": 0, "blocked": 0,
+                                   "last": [], "buckets": [], "pending_fix": False}
+        if not isinstance(e["last"], deque):
+            e["last"] = deque(e["last"], maxlen=FAIL_WINDOW_ATTEMPTS)
+            e["buckets"] = deque(e["buckets"])
+        return e
+
+    def _load(self):
+        if self._cmds is not None:
+            return
+        with self._lock:
+            if self._cmds is not None:
+                return
+            data = load_json(self.path, None)
+            if isinstance(data, dict):
+                self._cmds = OrderedDict(data.get("commands", {}))
+                self._evict()
+                return
+            self._cmds = OrderedDict()
+            for d in FEEDBACK_LOG.iter_records():
+                self._record(d.get("command"), d.get("status"), d.get("time") or 0)
+            self._dirty = True
+
+    def _record(self, cmd, status, ts):
+        if status not in ("success", "fail", "blocked"):
+            return
+        bucket = int(ts // FAIL_BUCKET_SECONDS)
+        failed = 1 if status == "fail" else 0
+        for key in (str(cmd), self.ALL):
+            e = self._entry(key)
+            self._cmds.move_to_end(key)
+            e[status] += 1
+            e["last"].append(failed)
+            b = e["buckets"]
+            if b and b[-1][0] == bucket:
+                b[-1][1] += 1; b[-1][2] += failed
+            else:
+                b.append([bucket, 1, failed])
+            self._expire(b, bucket)
+        self._evict()
+
+    def _evict(self):
+        while len(self._cmds) > FAIL_MAX_COMMANDS:
+            victim = next((k for k, e in self._cmds.items() if k != self.ALL and not e["pending_fix"]), None)
+            if victim is None:
+                return
+            del self._cmds[victim]
+
+    @staticmethod
+    def _expire(buckets, now_bucket):
+        oldest = now_bucket - FAIL_WINDOW_SECONDS // FAIL_BUCKET_SECONDS
+        while buckets and buckets[0][0] <= oldest:
+            buckets.popleft()
+
+    def record(self, cmd, status, ts=None):
+        self._load()
+        with self._lock:
+            self._record(cmd, status, time.time() if ts is None else ts)
+            self._dirty = True
+
+    # ---- queries (never touch the raw log) ----
+    def counts(self, cmd=ALL):
+        self._load()
+        with self._lock:
+            e = self._cmds.get(str(cmd))
+            return {k: e[k] for k in ("success", "fail", "blocked")} if e else {"success": 0, "fail": 0, "blocked": 0}
+
+    def recent_fail_rate(self, cmd=ALL):
+        """(rate over last FAIL_WINDOW_SECONDS, rate over last FAIL_WINDOW_ATTEMPTS)."""
+        self._load()
+        with self._lock:
+            e = self._cmds.get(str(cmd))
+            if not e:
+                return 0.0, 0.0
+            e = self._entry(str(cmd))
+            self._expire(e["buckets"], int(time.time() // FAIL_BUCKET_SECONDS))
+            n = sum(b[1] for b in e["buckets"])
+            f = sum(b[2] for b in e["buckets"])
+            last = e["last"]
+            return (f / n if n else 0.0), (sum(last) / len(last) if last else 0.0)
+
+    def top_failing(self, k=5):
+        """[(command, fail_count)] for the k most‑failing commands."""
+        self._load()
+        with self._lock:
+            rows = [(c, e["fail"]) for c, e in self._cmds.items() if c != self.ALL and e["fail"]]
+        return heapq.nlargest(k, rows, key=lambda r: r[1])
+
+    def claim_fix(self, cmd):
+        """True if no suggestion is pending for cmd (and mark one pending)."""
+        self._load()
+        with self._lock:
+            e = self._entry(str(cmd))
+            if e["pending_fix"]:
+                return False
+            e["pending_fix"] = self._dirty = True
+            return True
+
+    def release_fix(self, cmd):
+        self._load()
+        with self._lock:
+            if str(cmd) in self._cmds:
+                self._entry(str(cmd))["pending_fix"] = False
+                self._dirty = True
+
+    def flush(self, fsync=True):
+        with self._lock:
+            if not self._dirty or self._cmds is None:
+                return
+            snap = {c: {**e, "last": list(e["last"]), "buckets": [list(b) for b in e["buckets"]]}
+                    for c, e in self._cmds.items()}
+            self._dirty = False
+        save_json_atomic(self.path, {"commands": snap}, indent=None)
+
+FAIL_STATS = LOG_WRITER.register(FailureStats(STATS_FILE))
+
+def push_suggest_fix(command, suggestion):
+    if not FAIL_STATS.claim_fix(command):
+        return False  # same fix already waiting for CONFIRM
+    FIXES_LOG.append({"time": time.time(), "command": command, "suggestion": suggestion})
+    return True
+
+def analyze():
+    top = FAIL_STATS.top_failing(1)
+    if not top:
+        return
+    most, cnt = top[0]
+    if cnt >= 3:
+        speak(f"ध्यान दें: '{most}' बार‑बार फेल हो रहा है — CONFIRM टाइप करके placeholder जोड़ें", priority=PRIO_ALERT)
+        push_suggest_fix(most, "Recurring failure; check mapping/permissions")
+
+# ───────────────────────── Safety / Pentest Flow ─────────────────────────
+DANGEROUS_KEYWORDS = [
+    "exploit","ddos","reverse shell","rootkit","attack","payload","crack",
+    "hydra","sqlmap","metasploit","subfinder","ffuf","port scan","scan subnet"
+]
+
+def contains_dangerous(text):
+    return "DANGEROUS" in INTENT_ENGINE.hits(text)
+
+def is_valid_hostname_or_ip(s):
+    return bool(re.match(r"^\d{1,3}(?:\.\d{1,3}){3}$", s) or re.match(r"^[a-z0-9.-]{1,253}$", s, re.I))
+
+def verify_invite_token(target, token):
+    wl = WHITELIST.get()
+    return target in wl and wl[target].get("token") == token
+
+def require_typed_confirmation(timeout_seconds=60):
+    print("Dangerous action requested. TYPE: CONFIRM: YES")
+    speak("ध्यान दें: खतरनाक कार्रवाई के लिए टाइप करके पुष्टि करिए — CONFIRM: YES", priority=PRIO_ALERT)
+    start = time.time()
+    try:
+        while time.time() - start < timeout_seconds:
+            if sys.stdin in select_readable(0.5):
+                return input().strip() == "CONFIRM: YES"
+    except Exception:
+        pass
+    return False
+
+def select_readable(timeout):
+    import select
+    r, _, _ = select.select([sys.stdin], [], [], timeout)
+    return r
+
+def run_approved_action(action_name, target=None, extra_args=None):
+    cmd = APPROVED.get().get(action_name)
+    if cmd is None:
+        return False, f"Action '{action_name}' not found"
+    if cmd.slots and (not target or not is_valid_hostname_or_ip(target)):
+        return False, "Invalid/no target"
+    final = cmd.render(target)
+    if extra_args:
+        final += extra_args
+    audit_log({"phase": "pre-exec", "action": action_name, "cmd": final, "target": target})
+    try:
+        with span("device"):
+            proc = subprocess.run(final, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True, timeout=300)
+        out = proc.stdout
+        ok = True
+    except subprocess.CalledProcessError as e:
+        out = (e.stderr or str(e))
+        ok = False
+    audit_log({"phase": "post-exec", "action": action_name, "cmd": final, "target": target, "success": ok, "stdout_snippet": (out or "")[:1000]})
+    return ok, out
+
+# ───────────────────────── HTTP client ─────────────────────────
+COINGECKO_API   = "https://api.coingecko.com/api/v3"
+HTTP_RETRIES    = 2       # extra attempts on connection errors / 429 / 5xx (+ read timeouts for GET)
+HTTP_BACKOFF    = 0.5     # seconds before first retry, doubled each time
+HTTP_POOL_SIZE  = 8       # keep‑alive connections per host
+HTTP_CACHE_SIZE = 256
+HTTP_CACHE_TTL  = {       # URL prefix → seconds a 200 GET response is reused
+    COINGECKO_API + "/simple/price": 30,
+}
+
+class HttpClient:
+    """Shared keep‑alive session with a per‑endpoint TTL cache, in‑flight
+    deduplication of identical GETs and bounded retries with backoff.
+
+    Only GETs are cached/deduplicated; POSTs (HF) get pooling and retries,
+    but a POST that timed out is not resent (it may still be running server
+    side). The timeout a caller passes bounds the whole call, retries and
+    backoff included.
+    """
+
+    def __init__(self, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF, cache_ttl=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.cache_ttl = HTTP_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.stats = Counter()        # network / cache_hit / dedup / retry
+        self._session = None
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()   # key → (expires_at, response)
+        self._inflight = {}           # key → Future of the leader's response
+
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    s = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE,
+                                                            pool_maxsize=HTTP_POOL_SIZE)
+                    s.mount("http://", adapter)
+                    s.mount("https://", adapter)
+                    self._session = s
+        return self._session
+
+    def ttl_for(self, url):
+        best = ""
+        for prefix in self.cache_ttl:
+            if url.startswith(prefix) and len(prefix) > len(best):
+                best = prefix
+        return self.cache_ttl.get(best, 0)
+
+    def _send(self, method, url, timeout, **kw):
+        deadline = time.monotonic() + timeout
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            resp = err = None
+            try:
+                self.stats["network"] += 1
+                with span("http"):
+                    resp = self.session().request(method, url, timeout=max(deadline - time.monotonic(), 0.1), **kw)
+                if resp.status_code != 429 and resp.status_code < 500:
+                    return resp
+            except requests.ConnectionError as e:  # incl. ConnectTimeout: never reached the server
+                err = e
+            except requests.Timeout as e:
+                if method != "GET":
+                    raise
+                err = e
+            if attempt == self.retries or time.monotonic() + delay >= deadline:
+                break  # out of attempts or out of time
+            self.stats["retry"] += 1
+            time.sleep(delay)
+            delay *= 2
+        if err is not None:
+            raise err
+        return resp
+
+    def get(self, url, params=None, timeout=10, ttl=None, **kw):
+        key = (url, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+        ttl = self.ttl_for(url) if ttl is None else ttl
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit and hit[0] > time.time():
+                self._cache.move_to_end(key)
+                self.stats["cache_hit"] += 1
+                return hit[1]
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+        if not leader:
+            self.stats["dedup"] += 1
+            return fut.result()
+        try:
+            resp = self._send("GET", url, params=params, timeout=timeout, **kw)
+            if ttl and resp.status_code == 200:
+                with self._lock:
+                    self._cache[key] = (time.time() + ttl, resp)
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > HTTP_CACHE_SIZE:
+                        self._cache.popitem(last=False)
+            fut.set_result(resp)
+            return resp
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def post(self, url, timeout=30, **kw):
+        return self._send("POST", url, timeout=timeout, **kw)
+
+HTTP = HttpClient()
+
+# ───────────────────────── Trading helper ─────────────────────────
+PRICE_TTL    = 30                        # seconds a quote is served from cache
+WATCH_COINS  = ["bitcoin", "ethereum"]   # always fetched along, so asking about them next is free
+COIN_SYMBOLS = {"bitcoin": "BTC", "ethereum": "ETH"}
+DEFAULT_TRADE_PARAMS = {"sl_up": 0.01, "sl_down": 0.02, "tp": 0.03}
+_QUOTES      = {}                        # (coin, vs) → (fetched_at, price, change24)
+_QUOTES_LOCK = threading.Lock()
+
+def get_coin_prices(coin_ids, vs_currencies=("usd",)):
+    """Quotes for many coins in one CoinGecko call (cached ones aren't refetched).
+    Returns {coin: {vs: price, f"{vs}_24h_change": pct}} in the CoinGecko shape."""
+    coins = list(dict.fromkeys(coin_ids))
+    vs = list(dict.fromkeys(v.lower() for v in vs_currencies))
+    now = time.time()
+    fresh = lambda c, v: (c, v) in _QUOTES and now - _QUOTES[(c, v)][0] < PRICE_TTL
+    with _QUOTES_LOCK:
+        missing = [c for c in coins if not all(fresh(c, v) for v in vs)]
+    if missing:
+        ids = sorted(set(missing) | set(WATCH_COINS))
+        try:
+            r = HTTP.get(f"{COINGECKO_API}/simple/price",
+                         params={"ids": ",".join(ids), "vs_currencies": ",".join(sorted(vs)),
+                                 "include_24hr_change": "true"},
+                         timeout=10)
+            data = r.json() if r.status_code == 200 else {}
+        except Exception:
+            data = {}
+        with _QUOTES_LOCK:
+            for c, q in (data.items() if isinstance(data, dict) else []):
+                for v in vs:
+                    if q.get(v) is not None:
+                        _QUOTES[(c, v)] = (now, q[v], q.get(f"{v}_24h_change"))
+    out = {}
+    with _QUOTES_LOCK:
+        for c in coins:
+            for v in vs:
+                if fresh(c, v):
+                    _, price, change = _QUOTES[(c, v)]
+                    out.setdefault(c, {})[v] = price
+                    out[c][f"{v}_24h_change"] = change
+    return out
+
+def get_coin_price(coin_id="bitcoin", vs_currency="usd"):
+    return get_coin_prices([coin_id], [vs_currency]).get(coin_id, {})
+
+def trading_suggestion(coin_id="bitcoin", vs_currency="usd"):
+    data = get_coin_price(coin_id, vs_currency)
+    if not data:
+        return "Market data unavailable right now."
+    sym = COIN_SYMBOLS.get(coin_id, coin_id.upper())
+    # best parameter set from the backtester, if one has been saved
+    params = TRADE_PARAMS.get()
+    price = data.get(vs_currency)
+    change24 = data.get(f"{vs_currency}_24h_change") or 0
+    trend = "up" if change24 > 0 else "down"
+    sl_pct = params["sl_up"] if trend == "up" else params["sl_down"]
+    entry = float(price)
+    sl = round(entry*(1 - sl_pct), 2)
+    tp = round(entry*(1 + params["tp"]), 2)
+    return f"{sym} price ${entry:.2f}, 24h change {change24:.2f}%. Suggested entry ${entry:.2f}, stop-loss ${sl:.2f}, take-profit ${tp:.2f} (trend {trend})."
+
+def trading_suggestion_for_btc():
+    return trading_suggestion("bitcoin", "usd")
+
+# ───────────────────────── HF helper (optional) ─────────────────────────
+def hf_query(prompt, max_tokens=180):
+    if not HF_API_KEY:
+        return None, "no_token"
+    headers = {"Authorization": f"Bearer {HF_API_KEY}"}
+    payload = {"inputs": prompt, "parameters": {"max_new_tokens": max_tokens, "temperature": 0.1}}
+    try:
+        resp = HTTP.post(HF_API_URL, headers=headers, json=payload, timeout=30)
+        if resp.status_code != 200:
+            return None, f"HF {resp.status_code}: {resp.text[:200]}"
+        j = resp.json()
+        if isinstance(j, list) and j and isinstance(j[0], dict) and "generated_text" in j[0]:
+            return j[0]["generated_text"], None
+        if isinstance(j, dict) and "generated_text" in j:
+            return j["generated_text"], None
+        return str(j)[:1000], None
+    except Exception as e:
+        return None, str(e)
+
+# ───────────────────────── Intent normalizer ─────────────────────────
+TRIGGERS = {
+    "kaise ho abhi": [
+        "main theek hoon, ekdum mast 😎",
+        "ARVIND, main bilkul badhiya hoon! tum kaise ho?"
+    ]
+}
+FALLBACKS = [
+    "ARVIND, main samajh nahi paya — phir se bol do?",
+    "ek minute — yeh mujhe clear nahi hua. Dobara bolo, please."
+]
+
+GREETINGS = ("hello","hi","hey","namaste","salam")
+
+# Local intents, in priority order (first hit wins). VOLUME only resolves via VOLUME_RULES.
+INTENT_RULES = [
+    ("SCREENSHOT",      ["screenshot","स्क्रीनशॉट","screen shot"]),
+    ("LOCK",            ["lock","लॉक"]),
+    ("UNLOCK",          ["unlock","अनलॉक"]),
+    ("CAMERA",          ["camera","कैमरा","photo","फोटो"]),
+    ("VOLUME",          ["volume","वॉल्यूम","आवाज़","आवाज"]),
+    ("TIME",            ["time","समय","टाइम"]),
+    ("BATTERY",         ["battery","बैटरी"]),
+    ("OPEN_APP",        ["खोलो","open"]),
+    ("TRADE_ADVICE",    ["bitcoin","btc","buy bitcoin"]),
+    ("AUTHORIZED_SCAN", ["scan","port scan","run scan","run port"]),
+]
+VOLUME_RULES = [
+    ("VOLUME_UP",   ["increase","बढ़ा","फुल","up","ऊपर"]),
+    ("VOLUME_DOWN", ["decrease","कम","down","घटा"]),
+    ("VOLUME_MUTE", ["mute","म्यूट"]),
+]
+
+class IntentEngine:
+    """Aho–Corasick automaton over every keyword list (hi + en).
+
+    One pass over the lowercased text yields all keyword groups that occur as
+    substrings — same semantics as the old `any(x in t ...)` chains. Results
+    are memoized per text, so normalize_and_intent and smalltalk_reply share
+    a single scan for the same utterance.
+    """
+
+    def __init__(self, groups):
+        self.names = [name for name, _ in groups]
+        self.bit = {name: 1 << i for i, name in enumerate(self.names)}
+        goto, out = [{}], [0]
+        for name, kws in groups:
+            for kw in kws:
+                node = 0
+                for ch in kw.lower():
+                    nxt = goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[node][ch] = nxt
+                        goto.append({}); out.append(0)
+                    node = nxt
+                out[node] |= self.bit[name]
+        # failure links (BFS), then fold them into a full transition table
+        fail, order, queue = [0] * len(goto), [], deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for ch, nxt in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] |= out[fail[nxt]]
+                queue.append(nxt)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        for node in order:
+            delta[node] = {**delta[fail[node]], **goto[node]}
+        self._delta, self._out = delta, out
+        self._mask_names = {}
+        self.scan = lru_cache(maxsize=1024)(self._scan)
+
+    def _scan(self, t):
+        node, mask, delta, out = 0, 0, self._delta, self._out
+        for ch in t:
+            node = delta[node].get(ch, 0)
+            mask |= out[node]
+        return mask
+
+    def hits(self, text):
+        """Names of every keyword group present in text."""
+        mask = self.scan((text or "").lower())
+        names = self._mask_names.get(mask)
+        if names is None:
+            names = self._mask_names[mask] = frozenset(n for n in self.names if mask & self.bit[n])
+        return names
+
+def _build_intent_engine():
+    groups = [("DANGEROUS", DANGEROUS_KEYWORDS)] + INTENT_RULES + VOLUME_RULES
+    groups += [(f"TRIGGER:{k}", [k]) for k in TRIGGERS]
+    groups.append(("GREETING", list(GREETINGS)))
+    return IntentEngine(groups)
+
+INTENT_ENGINE = _build_intent_engine()
+
+def is_trigger(text):
+    hits = INTENT_ENGINE.hits(text)
+    for k in TRIGGERS:
+        if f"TRIGGER:{k}" in hits:
+            return k
+    return None
+
+def smalltalk_reply(text):
+    key = is_trigger(text)
+    if key:
+        return TRIGGERS[key][0]
+    if "GREETING" in INTENT_ENGINE.hits(text):
+        return "Namaste ARVIND! kaise ho?"
+    return None
+
+def normalize_and_intent(text):
+    hits = INTENT_ENGINE.hits(text)
+    if "DANGEROUS" in hits:
+        return ("DANGEROUS", None)
+    t = (text or "").lower()
+    # local intents (fast)
+    for intent, _ in INTENT_RULES:
+        if intent not in hits:
+            continue
+        if intent == "VOLUME":
+            for sub, _ in VOLUME_RULES:
+                if sub in hits:
+                    return (sub, None)
+            continue
+        if intent == "OPEN_APP":
+            app_name = t.replace("खोलो"," ").replace("open"," ").strip()
+            return ("OPEN_APP", app_name)
+        if intent == "TRADE_ADVICE":
+            return ("TRADE_ADVICE", "bitcoin")
+        if intent == "AUTHORIZED_SCAN":
+            m = re.search(r"((?:\d{1,3}\.){3}\d{1,3})|([a-z0-9.-]+\.[a-z]{2,})", t)
+            tgt = m.group(0) if m else None
+            return ("AUTHORIZED_SCAN", tgt)
+        return (intent, None)
+    return ("UNKNOWN", text)
+
+def classify_batch(texts):
+    """normalize_and_intent over many texts (e.g. the whole usage history);
+    repeated utterances are classified once."""
+    seen = {}
+    out = []
+    for text in texts:
+        r = seen.get(text)
+        if r is None:
+            r = seen[text] = normalize_and_intent(text)
+        out.append(r)
+    return out
+
+# ───────────────────────── STT (Voice) ─────────────────────────
+LISTEN_SECONDS = 7
+STT_RATE       = 16000
+STT_CHUNK      = 4000                  # frames per read (0.25 s @ 16 kHz)
+STT_BUFFER_SEC = 10                    # capture backlog kept while not listening
+STT_PREROLL    = 2                     # chunks kept from before listen() starts
+STT_RECALIBRATE_INTERVAL = 300         # seconds between background noise calibrations
+VOSK_MODEL_PATH = "vosk-model-small-hi-0.22"
+
+class AudioFeed:
+    """One continuously running 16 kHz mono int16 capture → bounded frame queue.
+
+    Source is the mic (PyAudio, opened once) or a WAV file, so the whole
+    voice pipeline can be driven and benchmarked without a microphone.
+    read() has the file‑like signature SpeechRecognition expects of a stream.
+    gate: callable; while it returns True mic frames are replaced by silence
+    (echo gate — the speaker and mic share the phone).
+    """
+
+    def __init__(self, wav_path=None, realtime=True, gate=None):
+        self.wav_path = wav_path
+        self.realtime = realtime
+        self.gate = gate
+        self.eof = False
+        self._q = queue.Queue(maxsize=max(1, STT_BUFFER_SEC * STT_RATE // STT_CHUNK))
+        self._buf = b""
+        self._pa = self._stream = self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread:
+            return self
+        if self.wav_path:
+            import wave
+            wf = wave.open(self.wav_path, "rb")
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != STT_RATE:
+                raise ValueError(f"{self.wav_path}: need mono 16‑bit {STT_RATE} Hz WAV")
+            src = lambda: wf.readframes(STT_CHUNK)
+        else:
+            import pyaudio
+            self._pa = pyaudio.PyAudio()
+            self._stream = self._pa.open(format=pyaudio.paInt16, channels=1, rate=STT_RATE,
+                                         input=True, frames_per_buffer=STT_CHUNK)
+            self._stream.start_stream()
+            src = lambda: self._stream.read(STT_CHUNK, exception_on_overflow=False)
+        self._thread = threading.Thread(target=self._capture, args=(src,), name="audio-feed", daemon=True)
+        self._thread.start()
+        return self
+
+    def _capture(self, src):
+        pace = STT_CHUNK / STT_RATE
+        while not self._stop.is_set():
+            try:
+                data = src()
+            except Exception as e:
+                print("[audio]", e)
+                data = b""
+            if not data:
+                self._put(None)  # EOF marker
+                return
+            if self.gate and not self.wav_path and self.gate():
+                data = bytes(len(data))  # silence keeps SpeechRecognition's frame timing intact
+            self._put(data)
+            if self.wav_path and self.realtime:
+                time.sleep(pace)
+
+    def _put(self, item):
+        # a file source must not lose frames; the mic drops the oldest backlog
+        if self.wav_path:
+            self._q.put(item)
+            return
+        while True:
+            try:
+                self._q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._q.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def drain(self, keep=STT_PREROLL):
+        """Drop stale backlog (e.g. our own TTS) but keep a short pre‑roll."""
+        if self.wav_path:
+            return
+        while self._q.qsize() > keep:
+            try:
+                self._q.get_nowait()
+            except queue.Empty:
+                break
+        self._buf = b""
+
+    def read(self, frames=STT_CHUNK, timeout=None):
+        want = frames * 2
+        while len(self._buf) < want and not self.eof:
+            try:
+                item = self._q.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self.eof = True
+                break
+            self._buf += item
+        out, self._buf = self._buf[:want], self._buf[want:]
+        return out
+
+    def close(self):
+        self._stop.set()
+        try:
+            if self._stream:
+                self._stream.stop_stream(); self._stream.close()
+            if self._pa:
+                self._pa.terminate()
+        except Exception:
+            pass
+        self._stream = self._pa = None
+
+class RecognizerManager:
+    """Keeps STT engines warm across utterances.
+
+    The Vosk model, KaldiRecognizer, SpeechRecognition Recognizer and the
+    audio device are created once; Google STT and Vosk both read from the
+    same AudioFeed. Ambient‑noise calibration is done once and refreshed in
+    the background every STT_RECALIBRATE_INTERVAL seconds while idle.
+    """
+
+    def __init__(self):
+        self.feed = None
+        self.partial = ""
+        self.on_partial = None          # callback(str) for live partial results
+        self.heard_at = None            # perf_counter() speech began in the last listen
+        self._lock = threading.RLock()  # one listen / calibration at a time
+        self._vosk = None               # KaldiRecognizer, or False if unavailable
+        self._sr = None
+        self._sr_source = None
+        self._calibrated_at = 0.0
+        self._recal_thread = None
+
+    @property
+    def exhausted(self):
+        return bool(self.feed and self.feed.eof)
+
+    def available(self):
+        """Cheap check (no model load) that at least one engine can run."""
+        if self._vosk:
+            return True
+        if sr:
+            return True
+        return self._vosk is None and bool(importlib.util.find_spec("vosk")) and os.path.exists(VOSK_MODEL_PATH)
+
+    def use_wav(self, path, realtime=True):
+        self.close()
+        self.feed = AudioFeed(wav_path=path, realtime=realtime)
+
+    def _ensure_feed(self):
+        if self.feed is None:
+            self.feed = AudioFeed(gate=lambda: SPEECH.speaking)
+        return self.feed.start()
+
+    # ---- Google (SpeechRecognition) ----
+    def _google_source(self):
+        if self._sr_source is None:
+            feed = self._ensure_feed()
+            class FeedSource(sr.AudioSource):
+                def __init__(self):
+                    self.SAMPLE_RATE, self.SAMPLE_WIDTH, self.CHUNK = STT_RATE, 2, STT_CHUNK
+                    self.stream = feed
+                def __enter__(self):
+                    return self
+                def __exit__(self, *exc):
+                    return False
+            self._sr = sr.Recognizer()
+            self._sr_source = FeedSource()
+        return self._sr_source
+
+    def _adjust(self, duration):
+        """Ambient‑noise calibration, skipped while we speak: the echo gate feeds
+        silence then, which would drag energy_threshold down. Caller holds _lock."""
+        if SPEECH.speaking:
+            return False
+        threshold = self._sr.energy_threshold
+        self.feed.drain(keep=0)  # the backlog may hold gated (silenced) playback
+        self._sr.adjust_for_ambient_noise(self._sr_source, duration=duration)
+        if SPEECH.speaking:  # playback started mid‑sample
+            self._sr.energy_threshold = threshold
+            return False
+        self._calibrated_at = time.time()
+        return True
+
+    def calibrate(self, duration=0.8):
+        with self._lock:
+            self._google_source()
+            self._adjust(duration)  # not calibrated yet → listen_google retries
+        if self._recal_thread is None and not self.feed.wav_path:
+            self._recal_thread = threading.Thread(target=self._recalibrate_loop, name="stt-recal", daemon=True)
+            self._recal_thread.start()
+
+    def _recalibrate_loop(self):
+        while True:
+            time.sleep(STT_RECALIBRATE_INTERVAL / 4)
+            if self._sr_source is None or time.time() - self._calibrated_at < STT_RECALIBRATE_INTERVAL:
+                continue
+            if self._lock.acquire(blocking=False):  # skip while a listen is in progress
+                try:
+                    self._adjust(0.8)
+                except Exception as e:
+                    print("[stt-recal]", e)
+                finally:
+                    self._lock.release()
+
+    def listen_google(self, timeout=LISTEN_SECONDS, phrase_limit=LISTEN_SECONDS):
+        if not sr:
+            return ""
+        try:
+            with self._lock:
+                source = self._google_source()
+                if not self._calibrated_at:
+                    self.calibrate()
+                self.feed.drain()
+                self.heard_at = None
+                print("सुन रहा हूँ... (Google STT)")
+                audio = self._sr.listen(source, timeout=timeout, phrase_time_limit=phrase_limit)
+                # listen() returns once the phrase ends; back‑date to its first frame
+                self.heard_at = time.perf_counter() - len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+            try:
+                return self._sr.recognize_google(audio, language='hi-IN')
+            except sr.UnknownValueError:
+                try:
+                    return self._sr.recognize_google(audio, language='en-US')
+                except Exception:
+                    return ""
+        except Exception as e:
+            print("[listen]", e)
+            return ""
+
+    # ---- Vosk (offline) ----
+    def _vosk_recognizer(self):
+        if self._vosk is None:
+            try:
+                from vosk import Model, KaldiRecognizer
+            except Exception:
+                self._vosk = False
+                return None
+            if not os.path.exists(VOSK_MODEL_PATH):
+                self._vosk = False
+                return None
+            self._vosk = KaldiRecognizer(Model(VOSK_MODEL_PATH), STT_RATE)
+        return self._vosk or None
+
+    def listen_vosk(self, timeout=None):
+        rec = self._vosk_recognizer()
+        if not rec:
+            return ""
+        with self._lock:
+            try:
+                feed = self._ensure_feed()
+            except Exception as e:
+                print("[listen]", e)
+                return ""
+            feed.drain()
+            self.heard_at = None
+            print("सुन रहा हूँ... (Vosk offline)")
+            start = time.time()
+            while True:
+                data = feed.read(STT_CHUNK, timeout=1.0)
+                if not data and feed.eof:
+                    return json.loads(rec.FinalResult()).get("text", "")
+                if data and rec.AcceptWaveform(data):
+                    self.partial = ""
+                    if self.heard_at is None:
+                        self.heard_at = time.perf_counter()
+                    return json.loads(rec.Result()).get("text", "")
+                if data:
+                    part = json.loads(rec.PartialResult()).get("partial", "")
+                    if part and self.heard_at is None:
+                        self.heard_at = time.perf_counter()  # first recognized word
+                    if part != self.partial:
+                        self.partial = part
+                        if self.on_partial:
+                            self.on_partial(part)
+                if timeout and time.time() - start > timeout:
+                    return json.loads(rec.FinalResult()).get("text", "")
+
+    def close(self):
+        if self.feed:
+            self.feed.close()
+        self.feed = None
+        self._sr_source = None
+        self._calibrated_at = 0.0
+
+STT = RecognizerManager()
+atexit.register(STT.close)
+
+def listen_google_stt(timeout=LISTEN_SECONDS, phrase_limit=LISTEN_SECONDS):
+    return STT.listen_google(timeout=timeout, phrase_limit=phrase_limit)
+
+def listen_vosk_offline():
+    return STT.listen_vosk()
+
+# ───────────────────────── Mode Runners ─────────────────────────
+def handle_intent(intent, meta, original_text):
+    if intent == "DANGEROUS":
+        speak("माफ़ कीजिए — मैं यह काम करने में मदद नहीं कर सकता।", priority=PRIO_ALERT)
+        log_feedback(original_text, "blocked", "dangerous")
+        save_memory(original_text, "blocked_dangerous")
+        return
 
-boot(auto_native_hint=args.native)
+    if intent == "SCREENSHOT":
+        take_screenshot(); save_memory(original_text, "screenshot"); return
+    if intent == "LOCK":
+        lock_device(); save_memory(original_text, "lock"); return
+    if intent == "UNLOCK":
+        unlock_device(); save_memory(original_text, "unlock"); return
+    if intent == "CAMERA":
+        camera_photo(); save_memory(original_text, "camera"); return
+    if intent == "VOLUME_UP":
+        set_volume(15); save_memory(original_text, "volume_up"); return
+    if intent == "VOLUME_DOWN":
+        set_volume(3); save_memory(original_text, "volume_down"); return
+    if intent == "VOLUME_MUTE":
+        set_volume(0); save_memory(original_text, "volume_mute"); return
+    if intent == "TIME":
+        speak(time.strftime("अभी समय है %H:%M:%S")); save_memory(original_text, "time"); return
+    if intent == "BATTERY":
+        if IS_TERMUX:
+            try:
+                with span("device"):
+                    out = subprocess.check_output(["dumpsys","battery"], text=True)
+                m = re.search(r"level: (\d+)", out)
+                level = m.group(1) if m else "unknown"
+                speak(f"बैटरी {level}% है")
+            except Exception:
+                speak("बैटरी लेवल नहीं मिला")
+        else:
+            speak("बैटरी info केवल Android/Termux पर")
+        save_memory(original_text, "battery"); return
+    if intent == "OPEN_APP":
+        opened = open_app(meta); save_memory(original_text, f"open_app:{meta}:{opened}"); return
+    if intent == "TRADE_ADVICE":
+        if meta == "bitcoin":
+            speak(trading_suggestion_for_btc()); save_memory(original_text, "trade_btc"); return
+    if intent == "AUTHORIZED_SCAN":
+        target = meta
+        if not target:
+            speak("कृपया लक्ष्य बताइए — IP या domain."); return
+        if not is_valid_hostname_or_ip(target):
+            speak("लक्ष्य invalid है."); return
+        if target not in WHITELIST.get():
+            speak("यह लक्ष्य whitelist में नहीं है — मालिक से invitation token लें.")
+            audit_log({"action":"scan_blocked","target":target,"reason":"not_whitelisted"})
+            return
+        speak("Owner invite token terminal में डालिए.")
+        token = input("Invite token: ").strip()
+        if not verify_invite_token(target, token):
+            speak("Token invalid. Aborting.")
+            audit_log({"action":"token_invalid","target":target})
+            return
+        if not require_typed_confirmation():
+            speak("Confirmation नहीं मिला — Aborting."); return
+        ok, out = run_approved_action("port_scan", target=target)
+        speak("Scan complete. Summary:" if ok else "Scan failed:")
+        if out:
+            for ln in (out[:300] if len(out) > 300 else out).splitlines()[:6]:
+                print(ln)
+        return
 
+    # Unknown → smalltalk or HF
+    st = smalltalk_reply(original_text)
+    if st:
+        speak(st); save_memory(original_text, st); return
+    with span("cache"):
+        cached = MEMORY_INDEX.lookup(original_text)
+    if cached:
+        speak(cached if len(cached) < 300 else cached[:300] + "…")
+        save_memory(original_text, cached, kind="cache")
+        log_feedback(original_text, "success", "memory_cache")
+        return
+    speak("सोच रहा हूँ…", priority=PRIO_STATUS, status=True)
+    with span("hf"):
+        hf_out, err = hf_query(original_text)
+    if hf_out:
+        trimmed = hf_out.strip()
+        speak(trimmed if len(trimmed) < 300 else trimmed[:300] + "…")
+        save_memory(original_text, trimmed, kind="hf")
+        log_feedback(original_text, "success", "hf_reply")
+    else:
+        speak("समझ नहीं आया — क्या सरल शब्दों में बोलोगे?")
+        log_feedback(original_text, "fail", err or "hf_fail")
+        save_memory(original_text, "hf_fail")
+
+def process_command(text, intent=None, meta=None):
+    """log → classify → handle one utterance, timing each stage in the current turn.
+    intent/meta: already classified by the caller (the daemon does, for its limits)."""
+    if text:
+        log_usage(text)
+    if intent is None:
+        with span("intent"):
+            intent, meta = normalize_and_intent(text)
+    turn = _TURN.get()
+    if turn is not None:
+        turn.intent = intent
+    with span("handle"):
+        handle_intent(intent, meta, text or intent)
+    return intent
+
+def run_voice_loop():
+    waiting = None  # perf_counter() we started waiting for the next utterance
+    while True:
+        try:
+            if not SPEECH_BARGE_IN:
+                SPEECH.wait_idle()  # don't let the mic hear our own TTS
+            if waiting is None:
+                waiting = time.perf_counter()
+            text = listen_google_stt()
+            if not text:
+                text = listen_vosk_offline()
+            if not text:
+                if STT.exhausted:  # --wav input finished
+                    break
+                continue
+            # the turn starts when speech was detected; the idle listen before it is stt_wait
+            heard = STT.heard_at or time.perf_counter()
+            TELEMETRY.record(None, "stt_wait", max(heard - waiting, 0.0))
+            waiting = None
+            with TELEMETRY.turn(start=heard) as turn:
+                turn.add("stt", time.perf_counter() - heard)
+                print(f"तुम बोले: {text}")
+                SPEECH.interrupt()
+                process_command(text)
+        except KeyboardInterrupt:
+            speak("सर्विस बंद कर रहा हूँ — बाय", wait=True)
+            break
+        except Exception as e:
+            print("[voice_loop]", e)
+            time.sleep(0.8)
+
+def run_text_loop():
+    speak("Text mode चालू है. Type commands (exit/quit to stop)")
+    while True:
+        try:
+            cmd = input("[ABHI] >>> ").strip()
+            if not cmd:
+                continue
+            if cmd.lower() in ("exit","quit","bye"):
+                speak("बाय 👋", wait=True); break
+            SPEECH.interrupt()
+            with TELEMETRY.turn():
+                process_command(cmd)
+        except KeyboardInterrupt:
+            speak("बाय 👋", wait=True); break
+        except Exception as e:
+            print("[text_loop]", e)
+
+# ───────────────────────── Updater Daemon ─────────────────────────
+def check_and_update():
+    if not UPDATE_URL:
+        return
+    try:
+        r = HTTP.get(UPDATE_URL, timeout=10, ttl=0)
+        if r.status_code != 200:
+            return
+        new_code = r.text
+        with open(SELF_FILE, "r", encoding="utf-8") as f:
+            cur = f.read()
+        if new_code and new_code != cur:
+            speak("नया संस्करण उपलब्ध — अपडेट कर रहा हूँ")
+            with open(SELF_FILE, "w", encoding="utf-8") as f:
+                f.write(new_code)
+            speak("अपडेट पूरा — कृपया script दोबारा चलाएँ")
+    except Exception:
+        pass
+
+def updater_daemon():
+    while True:
+        time.sleep(UPDATE_INTERVAL)
+        check_and_update()
+
+# ───────────────────────── Boot / Auto‑mic + Auto‑switch ─────────────────────────
+def run_in_background(fn, *args):
+    """Start fn in a daemon thread; returns a Future for its result."""
+    fut = Future()
+    def run():
+        try:
+            fut.set_result(fn(*args))
+        except Exception as e:
+            fut.set_exception(e)
+    threading.Thread(target=run, daemon=True).start()
+    return fut
+
+def boot(auto_native_hint=False, force_text=False):
+    # 1) updater
+    threading.Thread(target=updater_daemon, daemon=True).start()
+
+    # mic probing (sounddevice / SpeechRecognition device lists) runs while we greet
+    if force_text:
+        mic_probe = None
+    elif STT.feed and STT.feed.wav_path:
+        mic_probe = run_in_background(lambda: True)
+    else:
+        mic_probe = run_in_background(any_microphone_available)
+    run_in_background(MEMORY_INDEX.warm)
+
+    # 2) greet + analyze hint
+    speak("ABHI ready!")
+    analyze()
+
+    # 3) mic & environment
+    mic_ok = bool(mic_probe and mic_probe.result())
+    if mic_ok and not STT.available():
+        print("[ABHI] No STT engine (SpeechRecognition / Vosk model) installed")
+        mic_ok = False
+    env = "termux" if IS_TERMUX else ("linux-proot" if is_inside_proot_like_linux() else platform.system().lower())
+    print(f"[ABHI] Env: {env} | Mic: {'yes' if mic_ok else 'no'}")
+
+    if mic_ok:
+        run_voice_loop(); return
+
+    # No mic available
+    if not IS_TERMUX and is_inside_proot_like_linux() and not auto_native_hint:
+        # We are likely inside Ubuntu/proot on Android via Termux; attempt auto‑switch to Termux native
+        # Best effort: only works if this script is in /sdcard visible to Termux
+        sdcard_candidates = [SELF_FILE]
+        # If script not already in /sdcard, try to locate same name in /sdcard
+        base = os.path.basename(SELF_FILE)
+        if not SELF_FILE.startswith("/sdcard/"):
+            sdcard_candidates.append(f"/sdcard/{base}")
+        for candidate in sdcard_candidates:
+            ok, msg = try_relaunch_in_termux(candidate, extra_args=["--native"])
+            if ok:
+                speak("Mic नहीं — Termux native mode में स्विच कर रहा हूँ", wait=True)
+                # Do not wait; exit current process to avoid double instances
+                time.sleep(1)
+                LOG_WRITER.flush_all()
+                os._exit(0)
+        # If relaunch failed → fall through to text mode
+        print("[ABHI] Auto‑switch failed:", msg)
+
+    # Final fallback: text mode
+    speak("Mic नहीं मिला — Text mode पर शिफ्ट कर रहा हूँ")
+    run_text_loop()
+
+# ───────────────────────── Daemon (Unix socket API) ─────────────────────────
+# Protocol: one JSON object per line each way.
+#   → {"id": 1, "command": "time batao"}            (or {"intent": "TIME", "meta": null})
+#   ← {"id": 1, "ok": true, "intent": "TIME", "meta": null, "replies": ["…"], "ms": 1.2}
+# Extra request keys: "quiet": true (no print/TTS on the device), "op": "ping" | "stats".
+# The socket lives in a 0700 per‑user directory, never at a guessable name in shared /tmp
+# (LOG_DIR is /sdcard on Termux, which can't hold sockets, so it isn't used here).
+DAEMON_DIR     = (os.path.join(os.environ["XDG_RUNTIME_DIR"], "abhi") if os.environ.get("XDG_RUNTIME_DIR")
+                  else os.path.join(HOME, ".abhi_run"))
+DAEMON_SOCKET  = os.path.join(DAEMON_DIR, "daemon.sock")
+DAEMON_WORKERS = 4          # threads running handle_intent (device subprocesses, HF, …)
+DAEMON_DEFAULT_LIMIT = 4    # concurrent requests per intent group unless listed below
+INTENT_LIMITS = {           # intent → (group, max concurrent); one camera/screen/volume op at a time
+    "CAMERA":      ("camera", 1),
+    "SCREENSHOT":  ("screen", 1),
+    "LOCK":        ("lock", 1),
+    "UNLOCK":      ("lock", 1),
+    "VOLUME_UP":   ("volume", 1),
+    "VOLUME_DOWN": ("volume", 1),
+    "VOLUME_MUTE": ("volume", 1),
+    "OPEN_APP":    ("app", 1),
+    "UNKNOWN":     ("hf", 2),
+}
+DAEMON_INTERACTIVE = {"AUTHORIZED_SCAN"}   # needs terminal token + typed confirmation
+
+_REPLY_CAPTURE = contextvars.ContextVar("reply_capture", default=None)
+
+def _owned_socket(path):
+    """True if path is a socket we own inside a directory only we can use."""
+    try:
+        d, st = os.lstat(os.path.dirname(path) or "."), os.lstat(path)
+    except OSError:
+        return False
+    uid = os.getuid()
+    return (stat.S_ISDIR(d.st_mode) and d.st_uid == uid and not d.st_mode & 0o077
+            and stat.S_ISSOCK(st.st_mode) and st.st_uid == uid)
+
+class AssistantDaemon:
+    """asyncio front end: parses requests, applies per‑intent limits and runs
+    process_command on a bounded thread pool, returning what it said as JSON."""
+
+    def __init__(self, path=DAEMON_SOCKET, workers=DAEMON_WORKERS):
+        self.path = path
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="intent")
+        self._sems = {}
+        self._bound = False
+
+    def _limit(self, intent):
+        group, n = INTENT_LIMITS.get(intent, (intent, DAEMON_DEFAULT_LIMIT))
+        sem = self._sems.get(group)
+        if sem is None:
+            sem = self._sems[group] = asyncio.Semaphore(n)
+        return sem
+
+    @staticmethod
+    def _run_intent(intent, meta, text, quiet, t0, classify_secs):
+        cap = {"replies": [], "quiet": quiet}
+        token = _REPLY_CAPTURE.set(cap)
+        try:
+            with TELEMETRY.turn(intent) as turn:
+                turn.add("intent", classify_secs)
+                turn.add("queue", time.perf_counter() - t0)   # semaphore + pool wait
+                process_command(text, intent, meta)
+        finally:
+            _REPLY_CAPTURE.reset(token)
+        return cap["replies"]
+
+    async def dispatch(self, req):
+        if req.get("op") == "ping":
+            return {"ok": True, "pong": True, "pid": os.getpid()}
+        if req.get("op") == "stats":
+            return {"ok": True, "since": TELEMETRY.since, "by_intent": TELEMETRY.snapshot("intent"),
+                    "by_stage": TELEMETRY.snapshot("stage")}
+        text = str(req.get("command") or "")
+        t0 = time.perf_counter()
+        if req.get("intent"):
+            intent, meta = str(req["intent"]).upper(), req.get("meta")
+        elif text:
+            intent, meta = normalize_and_intent(text)
+        else:
+            return {"ok": False, "error": "need 'command' or 'intent'"}
+        classify_secs = time.perf_counter() - t0
+        if intent in DAEMON_INTERACTIVE:
+            return {"ok": False, "intent": intent, "meta": meta, "error": "interactive intent — use the terminal"}
+        t0 = time.perf_counter()
+        async with self._limit(intent):
+            replies = await asyncio.get_running_loop().run_in_executor(
+                self.pool, self._run_intent, intent, meta, text, bool(req.get("quiet")),
+                t0, classify_secs)
+        return {"ok": True, "intent": intent, "meta": meta, "replies": replies,
+                "ms": round((time.perf_counter() - t0) * 1e3, 2)}
+
+    async def _answer(self, line, writer, wlock):
+        try:
+            req = json.loads(line)
+            if not isinstance(req, dict):
+                raise ValueError("request must be a JSON object")
+            res = await self.dispatch(req)
+            if "id" in req:
+                res = {"id": req["id"], **res}
+        except Exception as e:
+            res = {"ok": False, "error": str(e)}
+        async with wlock:
+            writer.write((json.dumps(res, ensure_ascii=False) + "\n").encode("utf-8"))
+            await writer.drain()
+
+    async def _client(self, reader, writer):
+        # requests on one connection are pipelined; replies carry the request id
+        wlock, tasks = asyncio.Lock(), set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    t = asyncio.create_task(self._answer(line, writer, wlock))
+                    tasks.add(t)
+                    t.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve(self):
+        d = os.path.dirname(self.path) or "."
+        os.makedirs(d, mode=0o700, exist_ok=True)
+        st = os.lstat(d)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+            raise RuntimeError(f"{d} must be a directory owned by you with mode 0700")
+        if os.path.lexists(self.path):
+            if not _owned_socket(self.path):
+                raise RuntimeError(f"{self.path} is not our socket — refusing to replace it")
+            if daemon_request({"op": "ping"}, path=self.path, timeout=1) is not None:
+                raise RuntimeError(f"daemon already running on {self.path}")
+            os.remove(self.path)  # stale socket from a crashed run
+        old = os.umask(0o177)  # socket is created 0600, no window before a chmod
+        try:
+            server = await asyncio.start_unix_server(self._client, path=self.path)
+        finally:
+            os.umask(old)
+        self._bound = True
+        print(f"[ABHI] daemon listening on {self.path}")
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.pool.shutdown(wait=False)
+            if self._bound:  # never remove a socket another daemon is serving
+                try:
+                    os.remove(self.path)
+                except Exception:
+                    pass
+
+def daemon_request(payload, path=DAEMON_SOCKET, timeout=180):
+    """Send one request to a running daemon; None if none is listening
+    (or the socket isn't ours — never hand utterances to another user)."""
+    if not _owned_socket(path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as c:
+            c.settimeout(timeout)
+            c.connect(path)
+            c.sendall((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+            buf = b""
+            while not buf.endswith(b"\n"):
+                chunk = c.recv(65536)
+                if not chunk:
+                    break
+                buf += chunk
+        return json.loads(buf) if buf else None
+    except (OSError, ValueError):
+        return None
+
+# ───────────────────────── Argparse / Terminal helper ─────────────────────────
+def terminal_monitor():
+    while True:
+        try:
+            cmd = input().strip()
+            if not cmd:
+                continue
+            C = cmd.upper()
+            if C == "CONFIRM":
+                first = FIXES_LOG.pop("confirm")
+                if not first:
+                    print("कोई suggested fixes नहीं है."); continue
+                action = first.get("command", "")
+                FAIL_STATS.release_fix(action)
+                if action.startswith("open_app:"):
+                    app_name = action.split(":",1)[1]
+                    APP_MAP.update(lambda raw: raw.__setitem__(app_name, "com.example.placeholder"))
+                    print(f"Placeholder mapping added for '{app_name}'. Edit {APP_MAP_FILE} for real package.")
+                    speak(f"{app_name} के लिए placeholder जोड़ दिया — फ़ाइल एडिट करके सही package डाल देना")
+                else:
+                    print("Applied safe non‑destructive suggestion (logged).")
+            elif C == "ANALYZE":
+                analyze(); print("Analyze complete.")
+            elif C.startswith("TOPFAIL"):
+                k = int(C.split()[1]) if len(C.split()) > 1 and C.split()[1].isdigit() else 5
+                print(f"Top {k} failing commands:")
+                for name, fails in FAIL_STATS.top_failing(k):
+                    c = FAIL_STATS.counts(name)
+                    rate_t, rate_n = FAIL_STATS.recent_fail_rate(name)
+                    print(f"  {fails:5d} fail / {c['success']} ok / {c['blocked']} blocked | "
+                          f"last {FAIL_WINDOW_SECONDS // 60}m {rate_t:.0%}, last {FAIL_WINDOW_ATTEMPTS} {rate_n:.0%} | {name}")
+            elif C == "MEMORY" or C.startswith("MEMORY "):
+                query = cmd[len("MEMORY"):].strip()
+                if query:
+                    for score, said, answer in MEMORY_INDEX.search(query, 5):
+                        print(f"  {score:6.2f} | {said}" + (f"  →  {answer[:80]}" if answer else ""))
+                else:
+                    m = MEMORY_INDEX.summary()
+                    print(f"Memory: {m['docs']} conversations, {m['terms']} terms, {m['answers']} cached answers | "
+                          f"hit rate {m['hit_rate']:.0%} ({m['hits']}/{m['lookups']}: {m['exact']} exact, "
+                          f"{m['similar']} similar) | evicted {m['evicted']}")
+            elif C == "STATS" or C.startswith("STATS "):
+                arg = cmd[len("STATS"):].strip()
+                if arg.upper().startswith("EXPORT"):
+                    path = arg[len("EXPORT"):].strip() or LAT_EXPORT_FILE
+                    print(f"Exported {TELEMETRY.export(path)} histograms to {path}")
+                elif arg.upper() == "RESET":
+                    TELEMETRY.reset(); print("Latency stats reset.")
+                else:
+                    print("\n".join(TELEMETRY.report(arg.upper() or None)))
+            elif C == "PROFILE" or C.startswith("PROFILE "):
+                mode = cmd[len("PROFILE"):].strip().lower()
+                if mode in ("", "off", "stop"):
+                    res = TELEMETRY.stop_profile()
+                    if res is None:
+                        print("No profiler running. Use: PROFILE sample | PROFILE cprofile")
+                    else:
+                        print("\n".join(res[1])); print(f"Profile saved to {res[0]}")
+                elif TELEMETRY.start_profile(mode):
+                    print(f"{mode} profiler on — run some commands, then PROFILE OFF")
+                else:
+                    print("Profiler already running (PROFILE OFF) or unknown mode (sample | cprofile)")
+            elif C == "SHOWLOGS":
+                print("Recent feedback (last 10):")
+                for e in FEEDBACK_LOG.tail(10):
+                    print(e)
+            elif C in ("EXIT","QUIT"):
+                speak("सर्विस बंद कर रहा हूँ — बाय", wait=True); LOG_WRITER.flush_all(); os._exit(0)
+            else:
+                print("Commands: CONFIRM, ANALYZE, TOPFAIL [k], MEMORY [query], STATS [intent|EXPORT [path]|RESET], "
+                      "PROFILE [sample|cprofile|off], SHOWLOGS, EXIT")
+        except Exception as e:
+            print("[term_mon]", e)
+            time.sleep(0.5)
+
+def parse_args():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--native", action="store_true", help="hint: running under Termux native")
+    ap.add_argument("--command", help="run single normalized command in text mode then exit")
+    ap.add_argument("--wav", help="feed the voice loop from a 16 kHz mono WAV instead of the mic")
+    ap.add_argument("--daemon", action="store_true", help=f"serve commands on a Unix socket ({DAEMON_SOCKET})")
+    ap.add_argument("--text", action="store_true", help="skip mic detection and start in text mode")
+    return ap.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.daemon:
+        threading.Thread(target=updater_daemon, daemon=True).start()
+        run_in_background(MEMORY_INDEX.warm)
+        AssistantDaemon().run()
+        sys.exit(0)
+
+    if (args.command and os.path.exists(DAEMON_SOCKET)
+            and normalize_and_intent(args.command)[0] not in DAEMON_INTERACTIVE):
+        # a daemon is up: hand the command over instead of running it here
+        # (interactive intents need this terminal, so they always run locally)
+        res = daemon_request({"command": args.command})
+        if res is not None and res.get("intent") not in DAEMON_INTERACTIVE:
+            for line in res.get("replies", []):
+                print(f"{ASSISTANT_NAME}: {line}")
+            if not res.get("ok"):
+                print("[daemon]", res.get("error"))
+            sys.exit(0 if res.get("ok") else 1)
+
+    # Start terminal helper (so CONFIRM etc. work while voice/text loop runs)
+    threading.Thread(target=terminal_monitor, daemon=True).start()
+
+    if args.command:
+        # one‑shot command execution (useful for bridges)
+        with TELEMETRY.turn():
+            process_command(args.command)
+        sys.exit(0)
+
+    if args.wav:
+        STT.use_wav(args.wav)
+    boot(auto_native_hint=args.native, force_text=args.text)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Intent matcher benchmark: compiled IntentEngine vs the old substring chains.
+
+Replays a usage corpus (default: the live usage stream in LOG_DIR, or a
+legacy usage.json passed with --corpus), checks both implementations agree
+on every utterance, and prints per-call timings in two groups:
+
+  matcher  — each unique utterance once per pass, memo cache cleared before
+             every call, so the engine rows measure the automaton itself
+  memoized — the corpus as recorded (with repeats); shows what the per-text
+             cache and classify_batch add on top for real usage
+
+    python bench/bench_intent.py [--corpus usage.json] [--repeat 5]
+"""
+
+import os, sys, re, time, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import abhi_x2_final as abhi
+
+SAMPLE = [
+    "screenshot lo", "स्क्रीनशॉट लो", "phone lock karo", "unlock", "photo khicho",
+    "volume up", "आवाज़ कम करो", "volume mute", "time kya hai", "बैटरी कितनी है",
+    "whatsapp खोलो", "open youtube", "should i buy bitcoin", "scan lab.local",
+    "run exploit on 10.0.0.1", "kaise ho abhi", "hello there", "aaj mausam kaisa hai",
+]
+
+# ───────── reference: normalize_and_intent / smalltalk as they were before ─────────
+def legacy_contains_dangerous(text):
+    t = (text or "").lower()
+    return any(kw in t for kw in abhi.DANGEROUS_KEYWORDS)
+
+def legacy_normalize_and_intent(text):
+    if legacy_contains_dangerous(text):
+        return ("DANGEROUS", None)
+    t = (text or "").lower()
+    if any(x in t for x in ["screenshot","स्क्रीनशॉट","screen shot"]):
+        return ("SCREENSHOT", None)
+    if any(x in t for x in ["lock","लॉक"]):
+        return ("LOCK", None)
+    if any(x in t for x in ["unlock","अनलॉक"]):
+        return ("UNLOCK", None)
+    if any(x in t for x in ["camera","कैमरा","photo","फोटो"]):
+        return ("CAMERA", None)
+    if any(x in t for x in ["volume","वॉल्यूम","आवाज़","आवाज"]):
+        if any(x in t for x in ["increase","बढ़ा","फुल","up","ऊपर"]):
+            return ("VOLUME_UP", None)
+        if any(x in t for x in ["decrease","कम","down","घटा"]):
+            return ("VOLUME_DOWN", None)
+        if "mute" in t or "म्यूट" in t:
+            return ("VOLUME_MUTE", None)
+    if any(x in t for x in ["time","समय","टाइम"]):
+        return ("TIME", None)
+    if ("battery" in t) or ("बैटरी" in t):
+        return ("BATTERY", None)
+    if ("खोलो" in t) or ("open" in t):
+        app_name = t.replace("खोलो"," ").replace("open"," ").strip()
+        return ("OPEN_APP", app_name)
+    if any(x in t for x in ["bitcoin","btc","buy bitcoin"]):
+        return ("TRADE_ADVICE", "bitcoin")
+    if any(x in t for x in ["scan","port scan","run scan","run port"]):
+        m = re.search(r"((?:\d{1,3}\.){3}\d{1,3})|([a-z0-9.-]+\.[a-z]{2,})", t)
+        tgt = m.group(0) if m else None
+        return ("AUTHORIZED_SCAN", tgt)
+    return ("UNKNOWN", text)
+
+def legacy_smalltalk_reply(text):
+    t = (text or "").strip().lower()
+    for k in abhi.TRIGGERS:
+        if k in t:
+            return abhi.TRIGGERS[k][0]
+    if any(w in t for w in ("hello","hi","hey","namaste","salam")):
+        return "Namaste ARVIND! kaise ho?"
+    return None
+
+# ─────────────────────────────────────────────────────────────────────────────
+def load_corpus(path):
+    if path:
+        data = abhi.load_json(path, [])
+        return [d.get("command", "") for d in data if isinstance(d, dict)]
+    return [d.get("command", "") for d in abhi.USAGE_LOG.iter_records()]
+
+MIN_CALLS = 20000   # small corpora are looped so timings aren't noise
+
+def timed(fn, texts, repeat):
+    """Best seconds per text over `repeat` runs of fn(texts); the memo cache
+    is cleared once per pass over texts."""
+    passes = max(1, -(-MIN_CALLS // len(texts)))
+    best = float("inf")
+    for _ in range(repeat):
+        total = 0.0
+        for _ in range(passes):
+            abhi.INTENT_ENGINE.scan.cache_clear()
+            t0 = time.perf_counter()
+            fn(texts)
+            total += time.perf_counter() - t0
+        best = min(best, total / (passes * len(texts)))
+    return best
+
+def uncached(fn):
+    """fn over texts with the memo cache cleared before every call."""
+    clear = abhi.INTENT_ENGINE.scan.cache_clear
+    def run(ts):
+        for t in ts:
+            clear()
+            fn(t)
+    return run
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", help="legacy usage.json (list of {command: ...}); default: usage stream")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    texts = [t for t in load_corpus(args.corpus) if isinstance(t, str)]
+    if not texts:
+        print("usage corpus empty — falling back to built-in sample x500")
+        texts = SAMPLE * 500
+    print(f"corpus: {len(texts)} utterances ({len(set(texts))} unique)")
+
+    mismatches = 0
+    for t in set(texts):
+        if (abhi.normalize_and_intent(t) != legacy_normalize_and_intent(t)
+                or abhi.smalltalk_reply(t) != legacy_smalltalk_reply(t)):
+            mismatches += 1
+            if mismatches <= 10:
+                print("MISMATCH:", repr(t), abhi.normalize_and_intent(t), legacy_normalize_and_intent(t))
+    print(f"mismatches: {mismatches}")
+
+    def legacy_one(t):
+        if legacy_normalize_and_intent(t)[0] == "UNKNOWN":
+            legacy_smalltalk_reply(t)
+
+    def engine_one(t):
+        if abhi.normalize_and_intent(t)[0] == "UNKNOWN":
+            abhi.smalltalk_reply(t)
+
+    def each(fn):
+        return lambda ts: [fn(t) for t in ts]
+
+    unique = list(dict.fromkeys(texts))
+    groups = [
+        (f"matcher: {len(unique)} unique utterances, no memo hits", [
+            ("legacy (intent + smalltalk)", timed(each(legacy_one), unique, args.repeat)),
+            ("engine (intent + smalltalk)", timed(uncached(engine_one), unique, args.repeat)),
+            ("engine._scan only",           timed(each(lambda t: abhi.INTENT_ENGINE._scan(t.lower())), unique, args.repeat)),
+        ]),
+        (f"memoized: {len(texts)} utterances as recorded (repeats hit the cache)", [
+            ("legacy (intent + smalltalk)", timed(each(legacy_one), texts, args.repeat)),
+            ("engine (intent + smalltalk)", timed(each(engine_one), texts, args.repeat)),
+            ("classify_batch",              timed(abhi.classify_batch, texts, args.repeat)),
+        ]),
+    ]
+    for title, rows in groups:
+        print(title)
+        base = rows[0][1]
+        for name, secs in rows:
+            print(f"  {name:30s} {secs*1e6:7.2f} µs/utt  x{base/secs:5.2f}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
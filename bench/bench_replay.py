@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Replay benchmark: feeds a recorded usage corpus through the full pipeline
+(log_usage → normalize_and_intent → handle_intent) with the outside world stubbed:
+
+  device — subprocess calls (termux-*, dumpsys, am) return success after --device-ms
+  TTS    — SpeechWorker._play sleeps --tts-ms instead of speaking
+  HTTP   — CoinGecko / HF go to bench/stub_http.StubServer with --http-ms latency
+
+Runs in a throwaway HOME (logs, memory index and config don't touch yours)
+as if on Termux, so the device branches execute. Prints the same per‑intent /
+per‑stage p50/p95/p99 table as the STATS command.
+
+    python bench/bench_replay.py --corpus usage.json [--repeat 3] [--export run.jsonl]
+    python bench/bench_replay.py --baseline run.jsonl          # exit 1 on p95 regressions
+    python bench/bench_replay.py --profile sample              # + where the time went
+
+--corpus takes a legacy usage.json (list of {"command": ...}), a usage stream
+directory or .jsonl segment, or a plain text file with one utterance per line.
+"""
+
+import os, sys, json, time, tempfile, argparse, contextlib
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH)
+sys.path.insert(0, os.path.dirname(BENCH))
+
+SAMPLE = [
+    "screenshot lo", "phone lock karo", "unlock", "photo khicho", "volume up",
+    "आवाज़ कम करो", "volume mute", "time kya hai", "बैटरी कितनी है", "whatsapp खोलो",
+    "open youtube", "open telegram", "should i buy bitcoin", "kaise ho abhi",
+    "aaj mausam kaisa hai", "python mein list sort kaise kare", "aaj mausam kaisa hai",
+    "run exploit on 10.0.0.1",
+]
+
+def load_corpus(path):
+    if not path:
+        return []
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith(".jsonl"))
+    else:
+        files = [path]
+    texts = []
+    for fp in files:
+        with open(fp, "r", encoding="utf-8") as f:
+            raw = f.read()
+        try:
+            data = json.loads(raw)
+            rows = data if isinstance(data, list) else [data]
+        except ValueError:
+            rows = []
+            for line in raw.splitlines():
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    rows.append(line)  # plain text corpus
+        for r in rows:
+            t = r.get("command") if isinstance(r, dict) else r
+            if isinstance(t, str) and t.strip():
+                texts.append(t.strip())
+    return texts
+
+class StubSubprocess:
+    """Stands in for the subprocess module inside abhi_x2_final."""
+
+    PIPE = DEVNULL = -1
+
+    class CalledProcessError(Exception):
+        def __init__(self, returncode=1, cmd=None, output=None, stderr=None):
+            super().__init__(f"{cmd} returned {returncode}")
+            self.returncode, self.cmd, self.output, self.stderr = returncode, cmd, output, stderr
+
+    class CompletedProcess:
+        def __init__(self, args, stdout=""):
+            self.args, self.returncode, self.stdout, self.stderr = args, 0, stdout, ""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def run(self, args, **kw):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.CompletedProcess(args)
+
+    def check_output(self, args, **kw):
+        self.calls += 1
+        time.sleep(self.latency)
+        return "level: 87\n" if "battery" in args else ""
+
+    def Popen(self, *a, **kw):
+        raise OSError("no processes in replay")
+
+def compare(baseline_path, current, tolerance, floor_ms):
+    """Rows whose p95 got worse than baseline by > tolerance (and > floor_ms)."""
+    base = {}
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        for line in f:
+            r = json.loads(line)
+            base[(r["intent"], r["stage"])] = r  # last export in the file wins
+    worse = []
+    for key, m in current.items():
+        b = base.get(key)
+        if b and m["p95_ms"] > b["p95_ms"] * (1 + tolerance) and m["p95_ms"] - b["p95_ms"] > floor_ms:
+            worse.append((key, b["p95_ms"], m["p95_ms"]))
+    return worse
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", help="usage.json / usage stream dir / .jsonl / text file (default: built-in sample)")
+    ap.add_argument("--repeat", type=int, default=3, help="passes over the corpus")
+    ap.add_argument("--device-ms", type=float, default=2.0)
+    ap.add_argument("--tts-ms", type=float, default=0.0)
+    ap.add_argument("--http-ms", type=float, default=20.0)
+    ap.add_argument("--profile", choices=["sample", "cprofile"])
+    ap.add_argument("--export", help="append the histograms as JSONL (baseline for --baseline)")
+    ap.add_argument("--baseline", help="earlier --export file to compare p95 against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase")
+    ap.add_argument("--floor-ms", type=float, default=0.5, help="ignore p95 increases smaller than this")
+    ap.add_argument("--verbose", action="store_true", help="show what the assistant prints")
+    args = ap.parse_args()
+
+    texts = load_corpus(args.corpus) or SAMPLE * 20
+    home = tempfile.mkdtemp(prefix="abhi-replay-")
+    os.environ.update(HOME=home, TMPDIR=home)
+    os.environ.pop("PREFIX", None)
+    sys.argv = [sys.argv[0]]
+    import abhi_x2_final as abhi
+    from stub_http import StubServer
+
+    abhi.IS_TERMUX = True
+    abhi.subprocess = stub = StubSubprocess(args.device_ms / 1e3)
+    abhi.SPEECH._play = lambda text: time.sleep(args.tts_ms / 1e3)
+    abhi.UPDATE_URL = ""
+
+    with StubServer(latency=args.http_ms / 1e3) as http:
+        abhi.COINGECKO_API = http.url + "/api/v3"
+        abhi.HF_API_KEY, abhi.HF_API_URL = "stub", http.url + "/models/" + abhi.HF_MODEL
+        abhi.HTTP = abhi.HttpClient(backoff=0.01, cache_ttl={abhi.COINGECKO_API + "/simple/price": abhi.PRICE_TTL})
+        if args.profile:
+            abhi.TELEMETRY.start_profile(args.profile)
+
+        out = sys.stdout if args.verbose else open(os.devnull, "w")
+        skipped, t0 = 0, time.perf_counter()
+        with contextlib.redirect_stdout(out):
+            for _ in range(args.repeat):
+                for text in texts:
+                    if abhi.normalize_and_intent(text)[0] in abhi.DAEMON_INTERACTIVE:
+                        skipped += 1  # needs a typed token/confirmation
+                        continue
+                    with abhi.TELEMETRY.turn():
+                        abhi.process_command(text)
+            abhi.SPEECH.wait_idle(60)
+        wall = time.perf_counter() - t0
+        prof = abhi.TELEMETRY.stop_profile()
+
+    turns = args.repeat * len(texts) - skipped
+    print(f"corpus: {len(texts)} utterances ({len(set(texts))} unique) x{args.repeat} | "
+          f"{turns} turns in {wall:.2f} s ({turns / wall:.0f}/s), {skipped} interactive skipped")
+    print(f"stubs: {stub.calls} device calls, HTTP hits {dict(http.hits)}, "
+          f"memory cache {abhi.MEMORY_INDEX.summary()['hit_rate']:.0%}")
+    print("\n".join(abhi.TELEMETRY.report()))
+    if prof:
+        print(f"\n{args.profile} profile ({prof[0]}):")
+        print("\n".join(prof[1]))
+
+    current = abhi.TELEMETRY.snapshot()
+    rc = 0
+    if args.baseline:
+        worse = compare(args.baseline, current, args.tolerance, args.floor_ms)
+        print(f"\nvs {args.baseline}: {len(worse)} p95 regressions")
+        for (intent, stage), before, now in worse:
+            print(f"  {intent:14s} {stage:10s} p95 {before:8.2f} → {now:8.2f} ms")
+        rc = 1 if worse else 0
+    if args.export:
+        n = abhi.TELEMETRY.export(args.export, corpus=args.corpus or "sample", repeat=args.repeat)
+        print(f"exported {n} histograms to {args.export}")
+    return rc
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cold‑start benchmark against the budget in bench/startup_budget.json.
+
+  import  — `python -X importtime -c "import abhi_x2_final"`: module import cost
+            (plus the heaviest imports under it)
+  oneshot — `abhi_x2_final.py --command TIME`, spawn → exit
+  text    — `abhi_x2_final.py --text`, spawn → first "[ABHI] >>>" prompt
+  voice   — `abhi_x2_final.py --wav silence.wav`, spawn → first "सुन रहा हूँ"
+            (skipped when no STT engine is installed)
+
+Each mode runs with a throwaway HOME/TMPDIR so the user's logs and a running
+daemon don't affect the numbers. Best of --runs is compared to the budget.
+
+    python bench/bench_startup.py [--runs 5] [--modes import,oneshot,text,voice]
+"""
+
+import os, sys, json, time, wave, select, tempfile, argparse, subprocess
+
+ROOT   = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "abhi_x2_final.py")
+BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+def env_for(tmp):
+    env = dict(os.environ, HOME=tmp, TMPDIR=tmp, PYTHONUNBUFFERED="1")
+    env.pop("PREFIX", None)  # don't let a Termux PREFIX redirect logs to /sdcard
+    env.pop("XDG_RUNTIME_DIR", None)  # ... or a running daemon's socket take the command
+    return env
+
+def import_ms(tmp):
+    code = f"import sys; sys.argv=['x']; sys.path.insert(0, {ROOT!r}); import abhi_x2_final"
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                       env=env_for(tmp), capture_output=True, text=True)
+    rows = []
+    for line in p.stderr.splitlines():
+        # "import time:   self_us |   cumulative_us | <indent>name"
+        if line.startswith("import time:") and line.count("|") == 2:
+            self_us, cum_us, name = line[len("import time:"):].split("|")
+            if self_us.strip().isdigit() and cum_us.strip().isdigit():
+                name = name.rstrip()[1:]
+                rows.append((name.strip(), len(name) - len(name.lstrip()), int(cum_us)))
+    idx = next((i for i, r in enumerate(rows) if r[0] == "abhi_x2_final"), None)
+    if idx is None:
+        raise RuntimeError(p.stderr[-500:])
+    # children are printed before their parent, one indent level deeper
+    depth, children = rows[idx][1], []
+    for name, d, cum in reversed(rows[:idx]):
+        if d <= depth:
+            break
+        if d == depth + 2:
+            children.append((name, cum))
+    top = sorted(children, key=lambda r: -r[1])[:5]
+    return rows[idx][2] / 1e3, top
+
+def oneshot_ms(tmp):
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, SCRIPT, "--command", "TIME"], env=env_for(tmp),
+                   stdin=subprocess.DEVNULL, capture_output=True, timeout=60)
+    return (time.perf_counter() - t0) * 1e3
+
+def until_marker_ms(tmp, args, marker, timeout=60):
+    """Spawn, return ms until marker appears on stdout (None on timeout/exit)."""
+    t0 = time.perf_counter()
+    p = subprocess.Popen([sys.executable, SCRIPT, *args], env=env_for(tmp),
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    buf = b""
+    try:
+        while time.perf_counter() - t0 < timeout:
+            r, _, _ = select.select([p.stdout], [], [], 0.5)
+            if not r:
+                if p.poll() is not None:
+                    return None
+                continue
+            chunk = os.read(p.stdout.fileno(), 4096)
+            if not chunk:
+                return None
+            buf += chunk
+            if marker.encode("utf-8") in buf:
+                return (time.perf_counter() - t0) * 1e3
+        return None
+    finally:
+        p.kill()
+        p.wait()
+
+def silence_wav(tmp, seconds=3):
+    path = os.path.join(tmp, "silence.wav")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1); w.setsampwidth(2); w.setframerate(16000)
+        w.writeframes(b"\0\0" * 16000 * seconds)
+    return path
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--modes", default="import,oneshot,text,voice")
+    args = ap.parse_args()
+    with open(BUDGET, "r", encoding="utf-8") as f:
+        budget = json.load(f)
+
+    results, over = {}, False
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.modes.split(","):
+            samples, extra = [], ""
+            for _ in range(args.runs):
+                if mode == "import":
+                    ms, top = import_ms(tmp)
+                    extra = "  heaviest: " + ", ".join(f"{n} {c/1e3:.1f}ms" for n, c in top)
+                elif mode == "oneshot":
+                    ms = oneshot_ms(tmp)
+                elif mode == "text":
+                    ms = until_marker_ms(tmp, ["--text"], "[ABHI] >>>")
+                elif mode == "voice":
+                    ms = until_marker_ms(tmp, ["--wav", silence_wav(tmp)], "सुन रहा हूँ", timeout=30)
+                else:
+                    ap.error(f"unknown mode {mode}")
+                if ms is None:
+                    break
+                samples.append(ms)
+            limit = budget.get(f"{mode}_ms")
+            if not samples:
+                print(f"{mode:8s}      n/a   (budget {limit} ms) — marker never reached (no STT engine?)")
+                continue
+            best = min(samples)
+            results[mode] = round(best, 1)
+            status = "ok" if limit is None or best <= limit else "OVER"
+            over = over or status == "OVER"
+            print(f"{mode:8s} {best:8.1f} ms (budget {limit} ms) {status}{extra}")
+    print(json.dumps(results))
+    return 1 if over else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+STT latency / memory benchmark without a microphone.
+
+Transcribes the same WAV (16 kHz mono int16) N times two ways:
+
+  cold — old listen_vosk_offline behaviour: new vosk.Model + recognizer per utterance
+  warm — RecognizerManager: model loaded once, file fed through AudioFeed
+
+    python bench/bench_stt.py --wav sample.wav [--runs 5] [--model vosk-model-small-hi-0.22]
+"""
+
+import os, sys, time, json, wave, argparse, resource
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import abhi_x2_final as abhi
+
+def rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def cold_once(wav_path, model_path):
+    from vosk import Model, KaldiRecognizer
+    rec = KaldiRecognizer(Model(model_path), abhi.STT_RATE)
+    wf = wave.open(wav_path, "rb")
+    while True:
+        data = wf.readframes(abhi.STT_CHUNK)
+        if not data:
+            break
+        if rec.AcceptWaveform(data):
+            return json.loads(rec.Result()).get("text", "")
+    return json.loads(rec.FinalResult()).get("text", "")
+
+def warm_once(mgr, wav_path):
+    mgr.use_wav(wav_path, realtime=False)
+    return mgr.listen_vosk()
+
+def run(label, fn, runs):
+    lat = []
+    text = ""
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        text = fn()
+        lat.append(time.perf_counter() - t0)
+    first = lat[0]
+    lat.sort()
+    print(f"{label:5s} first {first*1e3:8.1f} ms  "
+          f"median {lat[len(lat)//2]*1e3:8.1f} ms  peak RSS {rss_mb():7.1f} MB  text={text!r}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--wav", required=True)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--model", default=abhi.VOSK_MODEL_PATH)
+    ap.add_argument("--only", choices=["cold", "warm"], help="run one mode (separate processes give clean RSS)")
+    args = ap.parse_args()
+    abhi.VOSK_MODEL_PATH = args.model
+
+    if args.only != "warm":
+        run("cold", lambda: cold_once(args.wav, args.model), args.runs)
+    if args.only != "cold":
+        mgr = abhi.RecognizerManager()
+        run("warm", lambda: warm_once(mgr, args.wav), args.runs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local stub for the HTTP endpoints ABHI talks to (CoinGecko simple/price, HF inference).
+
+    python bench/stub_http.py --port 8765           # serve until Ctrl+C
+    python bench/stub_http.py --check               # exercise HttpClient / get_coin_prices against it
+
+Point the assistant at it by setting abhi.COINGECKO_API / abhi.HF_API_URL, or use
+StubServer from other benchmarks:
+
+    with StubServer(latency=0.05) as stub:
+        abhi.COINGECKO_API = stub.url + "/api/v3"
+"""
+
+import os, sys, json, time, threading, argparse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+PRICES = {"bitcoin": 65000.0, "ethereum": 3200.0, "solana": 150.0, "dogecoin": 0.12}
+FX = {"usd": 1.0, "inr": 83.0, "eur": 0.92}
+
+class StubServer:
+    """Threaded stub server; counts hits per path and connections opened."""
+
+    def __init__(self, port=0, latency=0.0, fail_first=0):
+        self.latency = latency
+        self.fail_first = fail_first     # answer the first N requests with 503
+        self.hits = Counter()
+        self.connections = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep‑alive
+
+            def setup(self):
+                super().setup()
+                stub.connections += 1
+
+            def log_message(self, *a):
+                pass
+
+            def _send(self, code, obj):
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _maybe_fail(self):
+                time.sleep(stub.latency)
+                if stub.fail_first > 0:
+                    stub.fail_first -= 1
+                    self._send(503, {"error": "stub overloaded"})
+                    return True
+                return False
+
+            def do_GET(self):
+                u = urlparse(self.path)
+                stub.hits[u.path] += 1
+                if self._maybe_fail():
+                    return
+                if u.path.endswith("/simple/price"):
+                    q = parse_qs(u.query)
+                    ids = q.get("ids", [""])[0].split(",")
+                    vs = q.get("vs_currencies", ["usd"])[0].split(",")
+                    out = {}
+                    for c in ids:
+                        if c in PRICES:
+                            out[c] = {}
+                            for v in vs:
+                                if v in FX:
+                                    out[c][v] = round(PRICES[c] * FX[v], 4)
+                                    out[c][f"{v}_24h_change"] = 1.5 if c != "dogecoin" else -2.0
+                    self._send(200, out)
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                u = urlparse(self.path)
+                stub.hits[u.path] += 1
+                n = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(n) or b"{}")
+                if self._maybe_fail():
+                    return
+                self._send(200, [{"generated_text": f"stub reply to: {payload.get('inputs', '')}"}])
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def check():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import abhi_x2_final as abhi
+    from concurrent.futures import ThreadPoolExecutor
+
+    with StubServer(latency=0.05, fail_first=1) as stub:
+        abhi.COINGECKO_API = stub.url + "/api/v3"
+        abhi.HTTP = abhi.HttpClient(backoff=0.01, cache_ttl={abhi.COINGECKO_API + "/simple/price": 30})
+        t0 = time.perf_counter()
+        print("retry  :", abhi.get_coin_price("bitcoin"), f"({(time.perf_counter()-t0)*1e3:.0f} ms)")
+        t0 = time.perf_counter()
+        for _ in range(50):
+            abhi.trading_suggestion_for_btc()
+            abhi.trading_suggestion("ethereum")
+        print(f"cached : 100 suggestions in {(time.perf_counter()-t0)*1e3:.1f} ms")
+        multi = abhi.get_coin_prices(["solana", "dogecoin", "bitcoin"], ["usd", "inr"])
+        print("multi  :", json.dumps(multi))
+        abhi._QUOTES.clear()
+        abhi.HTTP._cache.clear()
+        with ThreadPoolExecutor(8) as ex:
+            list(ex.map(lambda _: abhi.HTTP.get(abhi.COINGECKO_API + "/simple/price",
+                                                params={"ids": "bitcoin", "vs_currencies": "usd"}), range(8)))
+        print("hits   :", dict(stub.hits), "| connections:", stub.connections)
+        print("client :", dict(abhi.HTTP.stats))
+        expect = stub.hits["/api/v3/simple/price"] == 4  # 503 + retry + multi + deduplicated burst
+        print("OK" if expect else "UNEXPECTED hit count")
+        return 0 if expect else 1
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--check", action="store_true")
+    args = ap.parse_args()
+    if args.check:
+        sys.exit(check())
+    with StubServer(args.port, latency=args.latency) as stub:
+        print(f"stub listening on {stub.url}  (CoinGecko: {stub.url}/api/v3, HF: {stub.url}/models/<name>)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()